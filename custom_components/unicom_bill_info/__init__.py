@@ -1,33 +1,341 @@
-import asyncio
+"""China Unicom bill info integration.
+
+只在模块顶层导入集成启动必需的内容，协调器和平台在设置条目时才加载，
+诊断等可选功能由 Home Assistant 在首次使用时导入。
+"""
+from __future__ import annotations
+
 import logging
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from .const import (
+    CONF_HOUSEHOLD,
+    DEFAULT_BASE_URL,
+    DEFAULT_BURST,
+    DEFAULT_EXPORT_BACKUPS,
+    DEFAULT_EXPORT_FLUSH_INTERVAL,
+    DEFAULT_EXPORT_MAX_BYTES,
+    DEFAULT_EXPORT_TOPIC_PREFIX,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_STARTUP_CONCURRENCY,
+    DEFAULT_STARTUP_SPACING,
+    DOMAIN,
+    PLATFORMS,
+    SIGNAL_ENTRY_LOADED,
+    SIGNAL_ENTRY_UNLOADED,
+)
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "unicom_bill_info"
+
+def _account(value):
+    """Validate one bulk-imported account; accounts.py is loaded only when accounts are listed."""
+    from .accounts import ACCOUNT_SCHEMA
+
+    return ACCOUNT_SCHEMA(value)
+
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.Schema({
+        # 所有账户共享的请求速率限制
+        vol.Optional("rate_limit", default={}): vol.Schema({
+            vol.Optional("requests_per_minute", default=DEFAULT_REQUESTS_PER_MINUTE):
+                vol.All(vol.Coerce(float), vol.Range(min=1, max=600)),
+            vol.Optional("burst", default=DEFAULT_BURST):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        }),
+        # 启动时各账户首次刷新的并发数和最小间隔（秒）
+        vol.Optional("startup", default={}): vol.Schema({
+            vol.Optional("concurrency", default=DEFAULT_STARTUP_CONCURRENCY):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+            vol.Optional("spacing", default=DEFAULT_STARTUP_SPACING):
+                vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+        }),
+        # 批量导入的账户，按 OpenID 去重，已配置的跳过
+        vol.Optional("accounts", default=[]): [_account],
+        # 批量导入账户的 CSV 文件，相对于配置目录
+        vol.Optional("accounts_file"): str,
+        # 回填历史账单的 CSV 文件，相对于配置目录
+        vol.Optional("history_file"): str,
+        # 把快照批量导出到 MQTT 或 JSON Lines 文件
+        vol.Optional("export"): vol.Schema({
+            vol.Optional("flush_interval", default=DEFAULT_EXPORT_FLUSH_INTERVAL):
+                vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+            vol.Optional("mqtt"): vol.Schema({
+                vol.Optional("topic_prefix", default=DEFAULT_EXPORT_TOPIC_PREFIX): str,
+                vol.Optional("qos", default=0): vol.In([0, 1, 2]),
+                vol.Optional("retain", default=True): bool,
+            }),
+            vol.Optional("file"): vol.Schema({
+                vol.Required("path"): str,
+                vol.Optional("max_bytes", default=DEFAULT_EXPORT_MAX_BYTES):
+                    vol.All(vol.Coerce(int), vol.Range(min=1024)),
+                vol.Optional("backups", default=DEFAULT_EXPORT_BACKUPS):
+                    vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+            }),
+        }),
+        # 创建汇总所有账户的家庭设备
+        vol.Optional("household", default=False): bool,
+        # 联通接口地址，按顺序优先使用，出错时自动切换；也可指向本地测试服务器
+        vol.Optional("base_urls", default=[DEFAULT_BASE_URL]):
+            vol.All([vol.Url()], vol.Length(min=1)),
+        # 按天压缩归档脱敏后的原始响应，总大小不超过 max_size_mb
+        vol.Optional("archive"): vol.Schema({
+            vol.Optional("path", default="unicom_archive"): str,
+            vol.Optional("max_size_mb", default=100):
+                vol.All(vol.Coerce(int), vol.Range(min=1, max=100000)),
+            vol.Optional("flush_interval", default=30):
+                vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+        }),
+        # 录制脱敏后的原始响应，用作回放测试数据
+        vol.Optional("record_dir"): str,
+    }),
+}, extra=vol.ALLOW_EXTRA)
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the shared request limiter, startup queue, services and HTTP APIs."""
+    from .api import EndpointPool
+    from .ratelimit import AdmissionQueue, TokenBucketLimiter
+
+    conf = config.get(DOMAIN) or CONFIG_SCHEMA({DOMAIN: {}})[DOMAIN]
+    rate_limit = conf["rate_limit"]
+    hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN]["config"] = conf
+    hass.data[DOMAIN]["limiter"] = TokenBucketLimiter(
+        rate_limit["requests_per_minute"] / 60, rate_limit["burst"]
+    )
+    hass.data[DOMAIN]["endpoints"] = EndpointPool(conf["base_urls"])
+    hass.data[DOMAIN]["admission"] = AdmissionQueue(
+        conf["startup"]["concurrency"], conf["startup"]["spacing"]
+    )
+
+    from homeassistant.helpers import discovery
+
+    # 所有账户共享的请求队列诊断实体
+    hass.async_create_task(
+        discovery.async_load_platform(hass, "sensor", DOMAIN, {"limiter": True}, config)
+    )
+
+    from .services import async_register_services
+
+    await async_register_services(hass)
+
+    from .websocket_api import async_register_websocket_commands
+
+    async_register_websocket_commands(hass)
+
+    if conf["accounts"] or conf.get("accounts_file"):
+        hass.async_create_task(async_import_accounts(hass, conf))
+
+    from .metrics import MetricsRenderer, MetricsView
+
+    hass.data[DOMAIN]["metrics"] = MetricsRenderer()
+    hass.http.register_view(MetricsView(hass.data[DOMAIN]["metrics"]))
+
+    if archive_conf := conf.get("archive"):
+        from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+        from .archive import ResponseArchive
+
+        archive = ResponseArchive(
+            hass.config.path(archive_conf["path"]),
+            archive_conf["max_size_mb"] * 1024 * 1024,
+            archive_conf["flush_interval"],
+        )
+        hass.data[DOMAIN]["archive"] = archive
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, archive.async_flush)
+
+    if path := conf.get("history_file"):
+        from .history import CsvHistorySource
+
+        hass.data[DOMAIN]["history_source"] = CsvHistorySource(hass, hass.config.path(path))
+
+    if "export" in conf:
+        hass.data[DOMAIN]["exporter"] = async_create_exporter(hass, conf["export"])
+
+    async_setup_household(hass, conf["household"])
+    return True
+
+def async_setup_household(hass: HomeAssistant, enabled: bool) -> None:
+    """Create or remove the config entry holding the household device."""
+    from homeassistant.config_entries import SOURCE_IMPORT
+
+    if enabled:
+        hass.async_create_task(hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": SOURCE_IMPORT}, data={CONF_HOUSEHOLD: True}
+        ))
+        return
+    # 从 configuration.yaml 中去掉后删除汇总设备
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.data.get(CONF_HOUSEHOLD):
+            hass.async_create_task(hass.config_entries.async_remove(entry.entry_id))
+
+def async_create_exporter(hass: HomeAssistant, conf: dict):
+    """Create the snapshot exporter with the configured sinks."""
+    from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+    from .export import JsonlFileSink, MqttSink, SnapshotExporter
+
+    sinks = []
+    if mqtt_conf := conf.get("mqtt"):
+
+        async def _publish(topic, payload, qos, retain):
+            from homeassistant.components import mqtt
+
+            await mqtt.async_publish(hass, topic, payload, qos, retain)
+
+        sinks.append(MqttSink(
+            _publish, mqtt_conf["topic_prefix"], mqtt_conf["qos"], mqtt_conf["retain"]
+        ))
+    if file_conf := conf.get("file"):
+        sinks.append(JsonlFileSink(
+            hass.config.path(file_conf["path"]), file_conf["max_bytes"], file_conf["backups"]
+        ))
+    exporter = SnapshotExporter(sinks, conf["flush_interval"])
+    # 停止前写出尚未发送的快照
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, exporter.async_flush)
+    return exporter
+
+async def async_import_accounts(hass: HomeAssistant, conf: dict) -> None:
+    """Create config entries for the accounts listed in YAML or the CSV file.
+
+    导入时不校验 OpenID，新条目的首次刷新经启动准入队列错开进行。
+    """
+    import asyncio
+
+    from homeassistant.config_entries import SOURCE_IMPORT
+
+    from .accounts import dedupe_accounts, read_accounts_csv
+
+    accounts = list(conf["accounts"])
+    if path := conf.get("accounts_file"):
+        try:
+            accounts += await hass.async_add_executor_job(read_accounts_csv, hass.config.path(path))
+        except (OSError, vol.Invalid) as err:
+            _LOGGER.error("Could not read accounts file %s: %s", path, err)
+
+    configured = {entry.unique_id for entry in hass.config_entries.async_entries(DOMAIN)}
+    pending = [
+        account for account in dedupe_accounts(accounts) if account["openid"] not in configured
+    ]
+    if pending:
+        _LOGGER.info("Importing %d accounts", len(pending))
+    # 各导入流程同时开始，创建条目后的首次刷新由准入队列限制并发
+    results = await asyncio.gather(
+        *(
+            hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": SOURCE_IMPORT}, data=account
+            )
+            for account in pending
+        ),
+        return_exceptions=True,
+    )
+    for account, result in zip(pending, results):
+        if isinstance(result, Exception):
+            _LOGGER.error("Could not import account ending in %s: %s", account["openid"][-4:], result)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up China Unicom Data from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    if entry.data.get(CONF_HOUSEHOLD):
+        from .household import HouseholdAggregate
+
+        # 汇总已经加载的账户，之后创建的协调器在创建时接入
+        household = HouseholdAggregate()
+        for coordinator in hass.data[DOMAIN].get("coordinators", {}).values():
+            household.track(coordinator)
+        hass.data[DOMAIN]["household"] = entry.runtime_data = household
+        await async_forward_setups(hass, entry)
+        return True
+
+    from .coordinator import async_acquire_coordinator
+    from .history import async_setup_history
 
+    coordinator = await async_acquire_coordinator(hass, entry)
+    entry.runtime_data = coordinator
+    hass.data[DOMAIN].setdefault("history", {})[entry.entry_id] = await async_setup_history(
+        hass, entry, coordinator, hass.data[DOMAIN].get("history_source")
+    )
+
+    await async_forward_setups(hass, entry)
+
+    # 选项修改后重新加载，使新选项生效
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+    # 通知 websocket 订阅等接入新的协调器
+    async_dispatcher_send(hass, SIGNAL_ENTRY_LOADED, entry)
+
+    return True
+
+async def async_forward_setups(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forward the setup of an entry to the platforms."""
     # Forward the setup to the sensor platform (compatible with new HA API)
     try:
-        await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     except AttributeError:
         # Fallback for older Home Assistant versions
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(entry, "sensor")
-        )
+        for platform in PLATFORMS:
+            hass.async_create_task(
+                hass.config_entries.async_forward_entry_setup(entry, platform)
+            )
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Use the OpenID as unique ID and remove exact duplicate entries."""
+    if entry.version == 1:
+        from .coordinator import get_entry_config
+
+        config = get_entry_config(entry)
+        others = [
+            other for other in hass.config_entries.async_entries(DOMAIN)
+            if other is not entry and get_entry_config(other).get("openid") == config["openid"]
+        ]
+        # 条目按顺序逐个迁移，迁移过程中没有等待；已迁移的即为之前的条目。
+        # 修改唯一 ID 会改变 async_entries 的顺序，不能按位置判断先后
+        if any(other.version >= 2 and get_entry_config(other) == config for other in others):
+            # 与之前的条目完全相同，合并即删除本条目；返回 False 使它不会被设置
+            _LOGGER.warning("Removing duplicate entry %s for the same OpenID", entry.title)
+            hass.async_create_task(hass.config_entries.async_remove(entry.entry_id))
+            return False
+        # 名称等设置不同的重复条目保留，由第一个条目持有唯一 ID，共用同一个协调器
+        held = any(other.unique_id == config["openid"] for other in others)
+        unique_id = None if held else config["openid"]
+        hass.config_entries.async_update_entry(entry, unique_id=unique_id, version=2)
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
-    if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok and entry.data.get(CONF_HOUSEHOLD):
+        hass.data[DOMAIN].pop("household").close()
+    elif unload_ok:
+        from .coordinator import async_release_coordinator
+
+        # 取消进行中的请求和定时器，确保重新加载后不会留下旧的协调器
+        await async_release_coordinator(hass, entry)
+        hass.data[DOMAIN]["history"].pop(entry.entry_id, None)
+
+        from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+        async_dispatcher_send(hass, SIGNAL_ENTRY_UNLOADED, entry)
 
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the data stored for a removed entry."""
+    if entry.data.get(CONF_HOUSEHOLD):
+        return
+    from .history import async_remove_history
+
+    await async_remove_history(hass, entry)
@@ -0,0 +1,34 @@
+"""Accounts provisioned in bulk from YAML or a CSV file.
+
+CSV 文件第一行为表头，至少包含 openid 列，可选 name、refresh_interval、
+create_individual_sensors、stale_grace 列，其余列忽略。
+"""
+import csv
+
+import voluptuous as vol
+
+ACCOUNT_SCHEMA = vol.Schema({
+    vol.Required("openid"): vol.All(str, vol.Strip, vol.Length(min=1)),
+    # 不填时导入时用 OpenID 末四位生成名称，避免大量同名设备
+    vol.Optional("name"): str,
+    vol.Optional("refresh_interval", default=15): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+    vol.Optional("create_individual_sensors", default=False): vol.Boolean(),
+    vol.Optional("stale_grace", default=0): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+}, extra=vol.REMOVE_EXTRA)
+
+
+def read_accounts_csv(path):
+    """Return the validated accounts listed in a CSV file."""
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        return [
+            ACCOUNT_SCHEMA({key: value for key, value in row.items() if value not in (None, "")})
+            for row in csv.DictReader(file)
+        ]
+
+
+def dedupe_accounts(accounts):
+    """Return the accounts with repeated OpenIDs removed, keeping the first."""
+    unique = {}
+    for account in accounts:
+        unique.setdefault(account["openid"], account)
+    return list(unique.values())
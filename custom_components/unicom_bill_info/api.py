@@ -0,0 +1,427 @@
+"""Async client for the 10010 mini-program API.
+
+本模块不依赖 Home Assistant，可以单独用于批量查询等脚本，
+集成中的协调器和配置流程只是它的调用方。
+"""
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+from .const import DEFAULT_BASE_URL
+
+_LOGGER = logging.getLogger(__name__)
+
+SUCCESS_CODE = "0000"
+
+BIGBALL_ENDPOINT = "sspbigball"
+BALANCE_ENDPOINT = "sspbalcbroadcast"
+HEADERS = {'Content-Type': 'application/json'}
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONCURRENCY = 8
+
+# 主机出错后暂停使用的时间（秒），以及延迟滑动平均的权重
+HOST_COOLDOWN = 60
+LATENCY_EWMA_ALPHA = 0.3
+
+# 联通接口没有公开的错误码文档，以下按返回描述中的关键字归类
+AUTH_KEYWORDS = ("openid", "登录", "失效", "过期", "未授权", "鉴权", "token")
+RATE_LIMIT_KEYWORDS = ("频繁", "限流", "稍后再试", "too many")
+
+
+class UnicomApiError(Exception):
+    """Base class for errors returned by the 10010 API."""
+
+
+class UnicomAuthError(UnicomApiError):
+    """The OpenID is invalid or expired."""
+
+
+class UnicomRateLimitError(UnicomApiError):
+    """The upstream is throttling us."""
+
+    def __init__(self, message, retry_after=None):
+        """Initialize with an optional server provided retry delay."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UnicomUpstreamError(UnicomApiError):
+    """The upstream returned an error unrelated to our request."""
+
+
+class UnicomServerError(UnicomUpstreamError):
+    """The host answered with an HTTP 5xx status."""
+
+
+class UnicomMalformedResponse(UnicomApiError):
+    """The response could not be understood."""
+
+
+class UnicomConnectionError(UnicomApiError):
+    """The request did not get a response."""
+
+
+class UnicomTimeoutError(UnicomConnectionError, TimeoutError):
+    """The response did not arrive in time."""
+
+
+def _describe(body):
+    """Return the human readable message of an error response."""
+    for key in ("desc", "msg", "message", "errorMsg"):
+        if body.get(key):
+            return str(body[key])
+    return ""
+
+
+def check_response(status, text, retry_after=None):
+    """Parse a response body and raise the matching UnicomApiError on failure.
+
+    Returns the decoded JSON body when the call succeeded.
+    """
+    if status == 429:
+        raise UnicomRateLimitError(f"HTTP {status}", _parse_retry_after(retry_after))
+    if status in (401, 403):
+        raise UnicomAuthError(f"HTTP {status}")
+    if status >= 500:
+        raise UnicomServerError(f"HTTP {status}")
+
+    try:
+        body = json.loads(text)
+    except ValueError as err:
+        raise UnicomMalformedResponse(f"Response is not JSON: {text[:80]!r}") from err
+    if not isinstance(body, dict) or "code" not in body:
+        raise UnicomMalformedResponse(f"Response has no code: {text[:80]!r}")
+
+    code = body["code"]
+    if code == SUCCESS_CODE:
+        return body
+
+    message = _describe(body)
+    lowered = message.lower()
+    if any(keyword in lowered for keyword in RATE_LIMIT_KEYWORDS):
+        raise UnicomRateLimitError(f"{code}: {message}", _parse_retry_after(retry_after))
+    if any(keyword in lowered for keyword in AUTH_KEYWORDS):
+        raise UnicomAuthError(f"{code}: {message}")
+    raise UnicomUpstreamError(f"{code}: {message}")
+
+
+def _parse_retry_after(value):
+    """Return a Retry-After header value in seconds, if it is numeric."""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def build_payload(openid):
+    """Return the request body shared by both endpoints."""
+    return {
+        "openid": openid,
+        "channel": "wxmini"
+    }
+
+
+def build_snapshot(voice_sms_data, balance_data):
+    """Combine both endpoint responses into one parsed snapshot."""
+    balance_items = balance_data.get("data")
+    if not balance_items or not isinstance(balance_items, list):
+        raise UnicomMalformedResponse("Balance response has an empty data array")
+    if not isinstance(balance_items[0], dict):
+        raise UnicomMalformedResponse(f"Balance item is not an object: {balance_items[0]!r:.80}")
+    return parse_snapshot(
+        usage_items(voice_sms_data),
+        balance_items[0], # Assuming only one item in balance data array
+    )
+
+
+def usage_items(voice_sms_data):
+    """Return the usage items of a sspbigball response, skipping malformed ones."""
+    items = voice_sms_data.get("data") or []
+    if not isinstance(items, list):
+        raise UnicomMalformedResponse(f"Usage data is not a list: {items!r:.80}")
+    return [item for item in items if isinstance(item, dict)]
+
+
+def parse_number(value, suffix=""):
+    """Parse strings like '120分钟' or '10条' into a float."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(suffix, "").strip())
+    except ValueError:
+        return None
+
+
+def parse_data_size(value):
+    """Parse strings like '46.98MB' or '1.5GB' into megabytes."""
+    if value is None:
+        return None
+    text = str(value).strip().upper()
+    for unit, factor in DATA_UNITS:
+        if text.endswith(unit):
+            number = parse_number(text[:-len(unit)])
+            return None if number is None else number * factor
+    return parse_number(text)
+
+
+def parse_ratio(value):
+    """Parse USED_RATIO, where '-1' means the ratio is not tracked."""
+    ratio = parse_number(value)
+    if ratio is None or ratio < 0:
+        return None
+    return round(ratio, 2)
+
+
+# 流量统一换算为 MB
+DATA_UNITS = (("TB", 1024 * 1024), ("GB", 1024), ("MB", 1), ("KB", 1 / 1024))
+
+# (前缀, SOURCE_TYPE, 是否要求 SPECIAL_TYPE 为 "1", 数值解析函数)
+USAGE_ITEMS = (
+    ("voice", "1", True, lambda value: parse_number(value, "分钟")),
+    ("sms", "2", True, lambda value: parse_number(value, "条")),
+    ("data", "3", False, parse_data_size),
+)
+
+BALANCE_FIELDS = {
+    "balance": "CANUSE_FEE_CUST",
+    "current_balance": "CURNT_BALANCE_CUST",
+    "fee_available": "FEE_AVAILABLE",
+    "total_owed": "ALLBOWE_FEE_CUST",
+    "real_fee": "REAL_FEE_CUST_NEW",
+    "credit_value": "CREDIT_VALUE",
+    "can_user_value": "CAN_USER_VALUE",
+}
+
+
+def _sum(values):
+    """Return the sum of the parsed values, or None if none could be parsed."""
+    values = [value for value in values if value is not None]
+    return sum(values) if values else None
+
+
+def parse_usage(items, snapshot=None):
+    """Parse the sspbigball items into numeric voice/sms/data fields.
+
+    语音单位为分钟，短信单位为条，流量单位为 MB。同类额度分成多项时（如通用流量、
+    定向流量和结转流量）各项相加，使用比例按合计重新计算。
+    不限量的套餐返回 USED_RATIO 为 -1、总量为 0 或无法解析，此时总量和余量记为 None。
+    """
+    snapshot = {} if snapshot is None else snapshot
+    for prefix, source_type, special, parse in USAGE_ITEMS:
+        matching = [
+            item for item in items
+            if item.get("SOURCE_TYPE") == source_type
+            and (not special or item.get("SPECIAL_TYPE") == "1")
+        ]
+        used = _sum(parse(item.get("X_USED_VALUE")) for item in matching)
+        total = _sum(parse(item.get("ADDUP_UPPER")) for item in matching)
+        available = _sum(parse(item.get("X_CANUSE_VALUE")) for item in matching)
+        if any(
+            (parse_number(item.get("USED_RATIO")) or 0) < 0 and not parse(item.get("ADDUP_UPPER"))
+            for item in matching
+        ):
+            # 不限量时 0 总量和余量没有意义，会拉低统计和家庭最小剩余流量；
+            # 其中一项不限量时合计也不限量
+            total = available = None
+        if len(matching) == 1:
+            ratio = parse_ratio(matching[0].get("USED_RATIO"))
+        else:
+            ratio = round(used / total * 100, 2) if used is not None and total else None
+        snapshot[f"{prefix}_used"] = used
+        snapshot[f"{prefix}_total"] = total
+        snapshot[f"{prefix}_exceed"] = _sum(parse(item.get("X_EXCEED_VALUE")) for item in matching)
+        snapshot[f"{prefix}_available"] = available
+        snapshot[f"{prefix}_ratio"] = ratio
+    return snapshot
+
+
+def parse_balance(item, snapshot=None):
+    """Parse the sspbalcbroadcast item into numeric fee fields in CNY."""
+    snapshot = {} if snapshot is None else snapshot
+    for key, field in BALANCE_FIELDS.items():
+        snapshot[key] = parse_number(item.get(field))
+    return snapshot
+
+
+def parse_snapshot(usage_items, balance_item):
+    """Return the flat numeric snapshot for one account."""
+    snapshot = parse_usage(usage_items)
+    parse_balance(balance_item, snapshot)
+    return snapshot
+
+
+class EndpointPool:
+    """Ordered API base URLs with latency tracking and failover.
+
+    请求优先发往延迟滑动平均最低的健康主机；尚未测得延迟的主机视为最快，
+    以便被尝试一次。主机连接失败、超时或返回 5xx 后在 cooldown 秒内不再优先使用。
+    """
+
+    def __init__(self, base_urls=(DEFAULT_BASE_URL,), cooldown=HOST_COOLDOWN):
+        """Initialize with base URLs in order of preference."""
+        self.base_urls = [url.rstrip("/") for url in base_urls]
+        self.cooldown = cooldown
+        self.latency = {}  # base -> 延迟滑动平均（秒）
+        self.failures = {}  # base -> 连续失败次数
+        self._unhealthy_until = {}
+
+    def candidates(self):
+        """Return the base URLs to try, best first; unhealthy hosts come last."""
+        now = time.monotonic()
+        healthy, unhealthy = [], []
+        for index, base in enumerate(self.base_urls):
+            key = (self.latency.get(base, 0.0), index)
+            if self._unhealthy_until.get(base, 0.0) > now:
+                unhealthy.append((self._unhealthy_until[base], index, base))
+            else:
+                healthy.append((key, base))
+        return [base for _, base in sorted(healthy)] + [base for *_, base in sorted(unhealthy)]
+
+    def record_success(self, base, latency):
+        """Fold a response time into the host's moving average."""
+        previous = self.latency.get(base)
+        self.latency[base] = (
+            latency if previous is None
+            else previous + LATENCY_EWMA_ALPHA * (latency - previous)
+        )
+        self.failures.pop(base, None)
+        self._unhealthy_until.pop(base, None)
+
+    def record_failure(self, base):
+        """Take a host out of rotation for the cooldown period."""
+        self.failures[base] = self.failures.get(base, 0) + 1
+        self._unhealthy_until[base] = time.monotonic() + self.cooldown
+
+    def status(self):
+        """Return the state of every host, e.g. for diagnostics."""
+        now = time.monotonic()
+        return [
+            {
+                "base_url": base,
+                "latency": self.latency.get(base),
+                "failures": self.failures.get(base, 0),
+                "healthy": self._unhealthy_until.get(base, 0.0) <= now,
+            }
+            for base in self.base_urls
+        ]
+
+
+class AiohttpTransport:
+    """Send requests with an aiohttp ClientSession."""
+
+    def __init__(self, session):
+        """Initialize with a session owned by the caller."""
+        self.session = session
+
+    async def post(self, url, payload):
+        """Return (status, body text, Retry-After header) for one POST."""
+        try:
+            async with self.session.post(url, json=payload, headers=HEADERS) as response:
+                # 编码错误的响应体按替换字符解码，之后按格式错误处理
+                text = await response.text(errors="replace")
+                return response.status, text, response.headers.get("Retry-After")
+        except aiohttp.ClientError as err:
+            raise UnicomConnectionError(f"{type(err).__name__}: {err}") from err
+
+
+class UnicomClient:
+    """Fetch and parse account snapshots from the 10010 API."""
+
+    def __init__(self, transport, timeout=DEFAULT_TIMEOUT, endpoints=None):
+        """Initialize with a transport, a per-request timeout in seconds and a host pool."""
+        self.transport = transport
+        self.timeout = timeout
+        self.endpoints = endpoints if endpoints is not None else EndpointPool()
+
+    async def async_post(self, endpoint, payload, before_request=None):
+        """Send one request to an endpoint and return its checked JSON body.
+
+        依次尝试主机池给出的主机，直到得到响应或所有主机都失败。
+        只有连接失败、超时和 5xx 才切换主机；业务错误码说明主机正常，直接抛出。
+        before_request 在每次请求发出前被等待，用于接入限流器，不计入超时。
+        """
+        candidates = self.endpoints.candidates()
+        for attempt, base in enumerate(candidates, 1):
+            try:
+                return await self._async_post_to(base, endpoint, payload, before_request)
+            except (UnicomConnectionError, UnicomServerError) as err:
+                self.endpoints.record_failure(base)
+                if attempt == len(candidates):
+                    raise
+                _LOGGER.debug("Failing over from %s: %s", base, err)
+
+    async def _async_post_to(self, base, endpoint, payload, before_request):
+        """Send one request to one host and record its latency."""
+        url = f"{base}/{endpoint}"
+        if before_request is not None:
+            await before_request()
+        started = time.monotonic()
+        try:
+            # 超时覆盖连接、等待和读取整个响应体，慢速滴漏的响应同样受限
+            async with asyncio.timeout(self.timeout):
+                status, text, retry_after = await self.transport.post(url, payload)
+        except TimeoutError as err:
+            raise UnicomTimeoutError(f"No response within {self.timeout}s from {url}") from err
+        if status < 500:
+            # 主机给出了响应，之后的业务错误与主机是否健康无关
+            self.endpoints.record_success(base, time.monotonic() - started)
+        return check_response(status, text, retry_after)
+
+    async def async_fetch(self, openid, before_request=None):
+        """Query both endpoints concurrently and return the parsed snapshot."""
+        payload = build_payload(openid)
+        # Request 1: sspbigball (Voice, SMS, Data usage)
+        # Request 2: sspbalcbroadcast (Balance)
+        tasks = [
+            asyncio.ensure_future(self.async_post(BIGBALL_ENDPOINT, payload, before_request)),
+            asyncio.ensure_future(self.async_post(BALANCE_ENDPOINT, payload, before_request)),
+        ]
+        try:
+            voice_sms_data, balance_data = await asyncio.gather(*tasks)
+        finally:
+            # 任一请求失败时取消另一个，并等待它真正结束、连接归还连接池后再返回
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return build_snapshot(voice_sms_data, balance_data)
+
+    async def async_fetch_usage(self, openid, before_request=None):
+        """Query only sspbigball and return the voice/sms/data fields."""
+        body = await self.async_post(BIGBALL_ENDPOINT, build_payload(openid), before_request)
+        return parse_usage(usage_items(body))
+
+    async def async_fetch_many(self, openids, concurrency=DEFAULT_CONCURRENCY):
+        """Fetch many accounts, yielding (openid, snapshot, error) as each finishes.
+
+        最多同时查询 concurrency 个账户；调用方消费过慢时会自动暂停发出新请求。
+        """
+        pending = iter(openids)
+        results = asyncio.Queue(maxsize=concurrency)
+        done = object()
+
+        async def _worker():
+            for openid in pending:
+                try:
+                    result = (openid, await self.async_fetch(openid), None)
+                except Exception as err:  # pylint: disable=broad-except
+                    result = (openid, None, err)
+                await results.put(result)
+
+        async def _run():
+            await asyncio.gather(*(_worker() for _ in range(concurrency)))
+            await results.put(done)
+
+        runner = asyncio.ensure_future(_run())
+        try:
+            while (result := await results.get()) is not done:
+                yield result
+        finally:
+            # 调用方提前停止消费时，取消并等待进行中的查询
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
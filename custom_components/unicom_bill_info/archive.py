@@ -0,0 +1,158 @@
+"""Compressed archive of raw API responses.
+
+每个响应（已脱敏）作为一行 JSON 追加到当天的 gzip 文件中，文件名形如
+responses-2024-05-01.jsonl.gz。写入先在内存中攒批，再放到线程池执行；
+归档总大小超过上限时从最早的一天开始删除。iter_archive 逐行读取，不会把整个文件载入内存。
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+
+from .replay import endpoint_name, redact
+
+_LOGGER = logging.getLogger(__name__)
+
+FILE_PREFIX = "responses-"
+FILE_SUFFIX = ".jsonl.gz"
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 30
+DEFAULT_BATCH_SIZE = 200
+
+
+def day_of(timestamp):
+    """Return the UTC date of a Unix timestamp as 'YYYY-MM-DD'."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def archive_files(directory):
+    """Return the archive file names in a directory, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name for name in names if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+    )
+
+
+class ResponseArchive:
+    """Buffer response records and write them to daily gzip files."""
+
+    def __init__(
+        self,
+        directory,
+        max_bytes=DEFAULT_MAX_BYTES,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        batch_size=DEFAULT_BATCH_SIZE,
+    ):
+        """Initialize with the archive directory and its disk budget."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer = []
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self._flushing = set()
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, record):
+        """Queue one record for the next batch."""
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self):
+        """Flush in the background."""
+        task = asyncio.ensure_future(self.async_flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def async_flush(self, *_):
+        """Write the buffered records without blocking the event loop."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        records, self._buffer = self._buffer, []
+        if not records:
+            return
+        # 串行写入，避免两批同时追加同一个文件
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, records)
+
+    def _write(self, records):
+        """Append records to their daily files and enforce the disk budget."""
+        os.makedirs(self.directory, exist_ok=True)
+        by_day = {}
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            by_day.setdefault(day_of(record["time"]), []).append(line)
+
+        for day, lines in sorted(by_day.items()):
+            data = gzip.compress("".join(lines).encode("utf-8"))
+            if not self._make_room(len(data)):
+                self.dropped += len(lines)
+                _LOGGER.warning("Response archive is full, dropped %d records", len(lines))
+                continue
+            # 每批作为一个新的 gzip 成员追加，gzip 读取时会自动连接
+            with open(os.path.join(self.directory, f"{FILE_PREFIX}{day}{FILE_SUFFIX}"), "ab") as file:
+                file.write(data)
+            self.written += len(lines)
+
+    def _make_room(self, size):
+        """Delete the oldest days until size more bytes fit in the budget."""
+        files = archive_files(self.directory)
+        sizes = {name: os.path.getsize(os.path.join(self.directory, name)) for name in files}
+        total = sum(sizes.values())
+        while files and total + size > self.max_bytes:
+            oldest = files.pop(0)
+            os.remove(os.path.join(self.directory, oldest))
+            total -= sizes[oldest]
+        return total + size <= self.max_bytes
+
+
+class ArchivingTransport:
+    """Send every response passing through another transport to the archive."""
+
+    def __init__(self, transport, archive):
+        """Initialize with the wrapped transport and the archive."""
+        self.transport = transport
+        self.archive = archive
+
+    async def post(self, url, payload):
+        """Forward the request and archive its response."""
+        status, text, retry_after = await self.transport.post(url, payload)
+        self.archive.add({
+            "time": time.time(),
+            "endpoint": endpoint_name(url),
+            "status": status,
+            "retry_after": retry_after,
+            "body": redact(text, payload.get("openid")),
+        })
+        return status, text, retry_after
+
+
+def iter_archive(directory, since=None, until=None):
+    """Yield archived records lazily, oldest first.
+
+    since 和 until 为 'YYYY-MM-DD'，包含两端；写入中断造成的不完整末尾会被跳过。
+    """
+    for name in archive_files(directory):
+        day = name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+        if (since and day < since) or (until and day > until):
+            continue
+        try:
+            with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as file:
+                for line in file:
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error, ValueError) as err:
+            _LOGGER.warning("Stopped reading damaged archive file %s: %s", name, err)
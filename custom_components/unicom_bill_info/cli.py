@@ -0,0 +1,372 @@
+"""Command line tools built on the standalone 10010 API client.
+
+Usage::
+
+    python -m custom_components.unicom_bill_info.cli fetch openids.txt -o results.jsonl
+    python -m custom_components.unicom_bill_info.cli fetch openids.txt --record fixtures/
+    python -m custom_components.unicom_bill_info.cli replay fixtures/ --iterations 10000
+    python -m custom_components.unicom_bill_info.cli memprofile fixtures/ --accounts 200 --budget 4096
+    python -m custom_components.unicom_bill_info.cli chaos fixtures/ --iterations 200 --fault-rate 0.5
+    python -m custom_components.unicom_bill_info.cli archive unicom_archive/ --since 2024-05-01
+
+输入文件每行一个 OpenID，空行和以 # 开头的行会被忽略；
+输出为 JSON Lines，每个账户一行，完成一个写一行。
+"""
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+import tracemalloc
+
+from .api import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_TIMEOUT,
+    AiohttpTransport,
+    EndpointPool,
+    UnicomApiError,
+    UnicomClient,
+)
+from .archive import iter_archive
+from .const import DEFAULT_BASE_URL
+from .replay import FAULTS, RecordingTransport, ReplayServer, ReplayTransport
+
+
+def read_openids(stream):
+    """Yield the OpenIDs listed in a text stream."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def result_record(openid, snapshot, error):
+    """Return the JSON Lines record for one fetch result."""
+    if error is not None:
+        return {
+            "openid": openid,
+            "ok": False,
+            "error": type(error).__name__,
+            "message": str(error),
+        }
+    return {"openid": openid, "ok": True, "snapshot": snapshot}
+
+
+async def async_fetch_command(args):
+    """Fetch every OpenID in the input file and write JSON Lines."""
+    import aiohttp
+
+    failures = 0
+    with args.input as source, args.output as sink:
+        async with aiohttp.ClientSession() as session:
+            transport = AiohttpTransport(session)
+            if args.record:
+                transport = RecordingTransport(transport, args.record)
+            client = UnicomClient(
+                transport, timeout=args.timeout, endpoints=EndpointPool(args.base_urls or [DEFAULT_BASE_URL])
+            )
+            async for openid, snapshot, error in client.async_fetch_many(
+                read_openids(source), concurrency=args.concurrency
+            ):
+                failures += error is not None
+                sink.write(json.dumps(result_record(openid, snapshot, error), ensure_ascii=False))
+                sink.write("\n")
+                sink.flush()
+    return 1 if failures else 0
+
+
+async def async_replay_command(args):
+    """Push recorded fixtures through the client and parser at full speed."""
+    transport = ReplayTransport.from_directory(args.directory)
+    client = UnicomClient(transport)
+    outcomes = collections.Counter()
+    openids = (f"replay-{index}" for index in range(args.iterations))
+
+    start = time.perf_counter()
+    async for _, snapshot, error in client.async_fetch_many(
+        openids, concurrency=args.concurrency
+    ):
+        outcomes["ok" if error is None else type(error).__name__] += 1
+        if args.dump and snapshot is not None:
+            args.dump.write(json.dumps(snapshot, ensure_ascii=False))
+            args.dump.write("\n")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{args.iterations} snapshots ({transport.requests} responses) in {elapsed:.3f}s, "
+        f"{args.iterations / elapsed:.0f} snapshots/s",
+        file=sys.stderr,
+    )
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}", file=sys.stderr)
+    return 0 if set(outcomes) <= {"ok"} or args.allow_errors else 1
+
+
+async def async_memprofile_command(args):
+    """Measure the memory retained per account after repeated refreshes.
+
+    每个账户保留一个客户端和最新快照（与协调器相同），先刷新一轮作为基线，
+    再刷新 refreshes 轮，比较两次的内存占用，找出持续增长的分配位置。
+    只测量客户端和快照，不包括 Home Assistant 中的协调器、实体和监听器；
+    录制数据中的错误响应与协调器一样保留上一次的快照。
+    """
+    transport = ReplayTransport.from_directory(args.directory)
+    openids = [f"replay-{index}" for index in range(args.accounts)]
+    failures = 0
+
+    tracemalloc.start(args.frames)
+    empty = tracemalloc.take_snapshot()
+    accounts = {openid: [UnicomClient(transport), None] for openid in openids}
+
+    async def _refresh_all():
+        nonlocal failures
+        for openid, account in accounts.items():
+            try:
+                account[1] = await account[0].async_fetch(openid)
+            except UnicomApiError:
+                failures += 1
+
+    await _refresh_all()
+    baseline = tracemalloc.take_snapshot()
+    for _ in range(args.refreshes):
+        await _refresh_all()
+    final = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    snapshot_filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    empty = empty.filter_traces(snapshot_filters)
+    baseline = baseline.filter_traces(snapshot_filters)
+    final = final.filter_traces(snapshot_filters)
+
+    retained = sum(stat.size_diff for stat in final.compare_to(empty, "filename"))
+    growth = sum(stat.size_diff for stat in final.compare_to(baseline, "filename"))
+    per_account = retained / args.accounts
+    print(
+        f"{args.accounts} accounts, {args.refreshes} refreshes: "
+        f"{per_account:.0f} bytes/account retained, "
+        f"{growth / args.accounts:+.0f} bytes/account since the first refresh",
+        file=sys.stderr,
+    )
+    if failures:
+        print(f"{failures} refreshes failed and kept the previous snapshot", file=sys.stderr)
+    print("Top allocation sites:", file=sys.stderr)
+    for stat in final.compare_to(empty, "lineno")[:args.top]:
+        print(f"  {stat}", file=sys.stderr)
+
+    if args.budget is not None and per_account > args.budget:
+        print(f"Over budget of {args.budget} bytes/account", file=sys.stderr)
+        return 1
+    return 0
+
+
+async def async_chaos_command(args):
+    """Fetch from a local stand-in server that injects faults and check nothing leaks.
+
+    请求经过真实的 aiohttp 客户端。检查项：每次查询在 timeout 加余量内结束；
+    所有失败都归类为 UnicomApiError；结束后没有遗留的任务，连接都已归还或关闭，
+    服务器端没有残留的半开连接；事件循环没有被长时间阻塞。
+    """
+    import aiohttp
+
+    server = ReplayServer(
+        ReplayTransport.from_directory(args.directory),
+        rate=args.fault_rate,
+        faults=args.faults or FAULTS,
+        seed=args.seed,
+    )
+    bound = args.timeout + args.margin
+    loop = asyncio.get_running_loop()
+    outcomes = collections.Counter()
+    problems = []
+    worst = 0.0
+    max_lag = 0.0
+
+    async def _heartbeat():
+        nonlocal max_lag
+        while True:
+            start = loop.time()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, loop.time() - start - 0.01)
+
+    base_url = await server.start()
+    before = asyncio.all_tasks()
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = UnicomClient(
+                AiohttpTransport(session), timeout=args.timeout, endpoints=EndpointPool([base_url])
+            )
+
+            async def _fetch(openid):
+                nonlocal worst
+                start = loop.time()
+                try:
+                    await client.async_fetch(openid)
+                    outcomes["ok"] += 1
+                except UnicomApiError as err:
+                    outcomes[type(err).__name__] += 1
+                except Exception as err:  # pylint: disable=broad-except
+                    outcomes[type(err).__name__] += 1
+                    problems.append(f"{openid}: unclassified {type(err).__name__}: {err}")
+                elapsed = loop.time() - start
+                worst = max(worst, elapsed)
+                if elapsed > bound:
+                    problems.append(f"{openid}: took {elapsed:.2f}s, bound is {bound:.2f}s")
+
+            heartbeat = asyncio.ensure_future(_heartbeat())
+            pending = [f"chaos-{index}" for index in range(args.iterations)]
+            for start in range(0, len(pending), args.concurrency):
+                await asyncio.gather(
+                    *(_fetch(openid) for openid in pending[start:start + args.concurrency])
+                )
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+            # 服务器端的处理任务在客户端断开后才结束，稍等片刻再统计
+            for _ in range(50):
+                if connection_counts(session.connector)[1] == server.open_connections:
+                    break
+                await asyncio.sleep(server.drip_interval)
+            leaked = [task for task in asyncio.all_tasks() - before if not task.done()]
+            acquired, pooled = connection_counts(session.connector)
+            if acquired:
+                problems.append(f"{acquired} connections still checked out of the pool")
+            if server.open_connections != pooled:
+                problems.append(
+                    f"server holds {server.open_connections} connections, "
+                    f"client pool has {pooled}"
+                )
+    finally:
+        await server.close()
+    if leaked:
+        problems.append(f"{len(leaked)} tasks still running after all fetches finished")
+    if max_lag > args.max_lag:
+        problems.append(f"event loop blocked for {max_lag:.3f}s")
+
+    print(
+        f"{args.iterations} fetches, worst {worst:.2f}s (bound {bound:.2f}s), "
+        f"max loop lag {max_lag * 1000:.1f}ms",
+        file=sys.stderr,
+    )
+    print(f"  injected: {dict(sorted(server.injected.items()))}", file=sys.stderr)
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}", file=sys.stderr)
+    for problem in problems[:20]:
+        print(f"FAIL {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def connection_counts(connector):
+    """Return (connections in use, idle pooled connections) of an aiohttp connector."""
+    # aiohttp 没有公开这两个数量，只能读取连接器的内部状态
+    acquired = len(connector._acquired)  # pylint: disable=protected-access
+    pooled = sum(len(conns) for conns in connector._conns.values())  # pylint: disable=protected-access
+    return acquired, pooled
+
+
+async def async_archive_command(args):
+    """Stream archived responses as JSON Lines, optionally filtered."""
+    count = 0
+    for record in iter_archive(args.directory, args.since, args.until):
+        if args.endpoint and record["endpoint"] != args.endpoint:
+            continue
+        if args.status is not None and record["status"] != args.status:
+            continue
+        args.output.write(json.dumps(record, ensure_ascii=False))
+        args.output.write("\n")
+        count += 1
+    print(f"{count} records", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    """Return the argument parser for all commands."""
+    parser = argparse.ArgumentParser(prog="unicom_bill_info")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="fetch snapshots for many OpenIDs")
+    fetch.add_argument(
+        "input", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default=sys.stdin,
+        help="file with one OpenID per line (default: stdin)",
+    )
+    fetch.add_argument(
+        "-o", "--output", type=argparse.FileType("w", encoding="utf-8"), default=sys.stdout,
+        help="JSON Lines output file (default: stdout)",
+    )
+    fetch.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    fetch.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    fetch.add_argument("--record", metavar="DIR", help="save redacted raw responses to DIR")
+    fetch.add_argument(
+        "--base-url", dest="base_urls", action="append", metavar="URL",
+        help=f"API base URL, repeat for failover (default: {DEFAULT_BASE_URL})",
+    )
+    fetch.set_defaults(handler=async_fetch_command)
+
+    replay = commands.add_parser("replay", help="replay recorded responses as a benchmark")
+    replay.add_argument("directory", help="fixture directory written by --record")
+    replay.add_argument("-n", "--iterations", type=int, default=1000)
+    replay.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    replay.add_argument(
+        "--dump", type=argparse.FileType("w", encoding="utf-8"),
+        help="write every parsed snapshot as JSON Lines",
+    )
+    replay.add_argument(
+        "--allow-errors", action="store_true",
+        help="exit 0 even when fixtures produce API errors",
+    )
+    replay.set_defaults(handler=async_replay_command)
+
+    memprofile = commands.add_parser(
+        "memprofile",
+        help="measure memory retained per account by the client and snapshot "
+        "(not the Home Assistant coordinator, entities or listeners)",
+    )
+    memprofile.add_argument("directory", help="fixture directory written by --record")
+    memprofile.add_argument("-a", "--accounts", type=int, default=100)
+    memprofile.add_argument("-r", "--refreshes", type=int, default=20)
+    memprofile.add_argument(
+        "--budget", type=int, metavar="BYTES",
+        help="exit 1 when the bytes retained per account exceed BYTES",
+    )
+    memprofile.add_argument("--top", type=int, default=10, help="allocation sites to list")
+    memprofile.add_argument("--frames", type=int, default=1, help="traceback depth to record")
+    memprofile.set_defaults(handler=async_memprofile_command)
+
+    chaos = commands.add_parser(
+        "chaos", help="inject upstream faults and check that fetches stay time-bounded"
+    )
+    chaos.add_argument("directory", help="fixture directory with healthy responses")
+    chaos.add_argument("-n", "--iterations", type=int, default=200)
+    chaos.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    chaos.add_argument("--fault-rate", type=float, default=0.5)
+    chaos.add_argument(
+        "--fault", dest="faults", action="append", choices=FAULTS,
+        help="inject only this fault (repeatable, default: all)",
+    )
+    chaos.add_argument("--timeout", type=float, default=0.5, help="per-request timeout")
+    chaos.add_argument("--margin", type=float, default=0.25, help="allowed overrun per fetch")
+    chaos.add_argument("--max-lag", type=float, default=0.1, help="allowed event loop stall")
+    chaos.add_argument("--seed", type=int)
+    chaos.set_defaults(handler=async_chaos_command)
+
+    archive = commands.add_parser("archive", help="stream records from a response archive")
+    archive.add_argument("directory", help="archive directory")
+    archive.add_argument("--since", metavar="YYYY-MM-DD")
+    archive.add_argument("--until", metavar="YYYY-MM-DD")
+    archive.add_argument("--endpoint", help="only records of this endpoint, e.g. sspbigball")
+    archive.add_argument("--status", type=int, help="only records with this HTTP status")
+    archive.add_argument(
+        "-o", "--output", type=argparse.FileType("w", encoding="utf-8"), default=sys.stdout,
+    )
+    archive.set_defaults(handler=async_archive_command)
+    return parser
+
+
+def main(argv=None):
+    """Run the command line interface."""
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
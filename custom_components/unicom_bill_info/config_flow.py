@@ -1,23 +1,101 @@
+import asyncio
+import logging
+
+import aiohttp
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    UnicomAuthError,
+    UnicomConnectionError,
+    UnicomMalformedResponse,
+    UnicomRateLimitError,
+    UnicomUpstreamError,
+    AiohttpTransport,
+    UnicomClient,
+)
+from .const import CONF_HOUSEHOLD, DOMAIN, HOUSEHOLD_UNIQUE_ID
+from .coordinator import get_entry_config
+from .ratelimit import PRIORITY_INTERACTIVE, RequestShed
+
+_LOGGER = logging.getLogger(__name__)
+
+# 配置流程中校验 OpenID 的超时时间（秒）
+VALIDATION_TIMEOUT = 8
+
+
+async def async_validate_openid(hass, openid):
+    """Probe both endpoints with the OpenID.
+
+    Returns (snapshot, None) on success or (None, error key) on failure.
+    """
+    limiter = hass.data.get(DOMAIN, {}).get("limiter")
+
+    async def _before_request():
+        if limiter is not None:
+            await limiter.acquire(PRIORITY_INTERACTIVE, VALIDATION_TIMEOUT)
+
+    try:
+        client = UnicomClient(
+            AiohttpTransport(async_get_clientsession(hass)),
+            timeout=VALIDATION_TIMEOUT,
+            endpoints=hass.data.get(DOMAIN, {}).get("endpoints"),
+        )
+        snapshot = await client.async_fetch(openid, before_request=_before_request)
+    except UnicomAuthError:
+        return None, "invalid_auth"
+    except (UnicomRateLimitError, RequestShed):
+        return None, "rate_limited"
+    except UnicomMalformedResponse:
+        return None, "invalid_response"
+    except asyncio.TimeoutError:
+        return None, "timeout"
+    except (UnicomConnectionError, UnicomUpstreamError, aiohttp.ClientError):
+        return None, "cannot_connect"
+    except Exception:  # pylint: disable=broad-except
+        _LOGGER.exception("Unexpected error validating OpenID")
+        return None, "cannot_connect"
+    return snapshot, None
+
+
+def openid_in_use(hass, openid, entry):
+    """Return True if another entry already polls this OpenID."""
+    return any(
+        other.entry_id != entry.entry_id
+        and openid in (other.unique_id, get_entry_config(other).get("openid"))
+        for other in hass.config_entries.async_entries(DOMAIN)
+    )
 
-class ChinaUnicomDataConfigFlow(config_entries.ConfigFlow, domain="unicom_bill_info"):
+
+class ChinaUnicomDataConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for China Unicom Data."""
 
-    VERSION = 1
+    VERSION = 2
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
-            # You might want to add some basic validation here
             if not user_input["openid"]:
                 errors["base"] = "openid_required"
             else:
-                return self.async_create_entry(title=user_input["name"], data=user_input)
+                # 同一 OpenID 只能配置一次，在发出校验请求前检查
+                await self.async_set_unique_id(user_input["openid"])
+                self._abort_if_unique_id_configured()
+                snapshot, error = await async_validate_openid(self.hass, user_input["openid"])
+                if error:
+                    errors["base"] = error
+                else:
+                    # 交给新条目的首次刷新使用，省去一次网络请求
+                    self.hass.data.setdefault(DOMAIN, {}).setdefault(
+                        "validated_snapshots", {}
+                    )[user_input["openid"]] = (snapshot, dt_util.utcnow())
+                    return self.async_create_entry(title=user_input["name"], data=user_input)
 
         data_schema = vol.Schema({
             vol.Required("name", default="联通数据"): str,
@@ -26,11 +104,73 @@ class ChinaUnicomDataConfigFlow(config_entries.ConfigFlow, domain="unicom_bill_i
                 vol.Coerce(int), vol.Range(min=1, max=60)
             ),
             vol.Optional("create_individual_sensors", default=False): bool,
+            vol.Optional("stale_grace", default=0): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=1440)
+            ),
         })
         return self.async_show_form(
             step_id="user", data_schema=data_schema, errors=errors
         )
 
+    async def async_step_import(self, import_data):
+        """Create an entry for an account listed in YAML or the accounts file.
+
+        configuration.yaml 启用家庭汇总时也由此创建持有汇总设备的条目。
+        """
+        if import_data.get(CONF_HOUSEHOLD):
+            await self.async_set_unique_id(HOUSEHOLD_UNIQUE_ID)
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(title="家庭汇总", data={CONF_HOUSEHOLD: True})
+
+        openid = import_data["openid"]
+        await self.async_set_unique_id(openid)
+        self._abort_if_unique_id_configured()
+        data = {"name": f"联通数据 {openid[-4:]}", **import_data}
+        return self.async_create_entry(title=data["name"], data=data)
+
+    async def async_step_reauth(self, entry_data):
+        """Handle an OpenID rejected by the 10010 API."""
+        self._reauth_entry = self.hass.config_entries.async_get_entry(
+            self.context["entry_id"]
+        )
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input=None):
+        """Ask for a new OpenID for the existing entry."""
+        errors = {}
+        entry = self._reauth_entry
+        if user_input is not None:
+            if not user_input["openid"]:
+                errors["base"] = "openid_required"
+            elif openid_in_use(self.hass, user_input["openid"], entry):
+                errors["base"] = "already_configured"
+            else:
+                _, error = await async_validate_openid(self.hass, user_input["openid"])
+                if error:
+                    errors["base"] = error
+                else:
+                    data = {**entry.data, "openid": user_input["openid"]}
+                    options = dict(entry.options)
+                    # 选项中的 OpenID 会覆盖 data，需要一起更新
+                    if "openid" in options:
+                        options["openid"] = user_input["openid"]
+                    return self.async_update_reload_and_abort(
+                        entry, unique_id=user_input["openid"], data=data, options=options
+                    )
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema({vol.Required("openid"): str}),
+            description_placeholders={"name": entry.title},
+            errors=errors,
+        )
+
+    @classmethod
+    @callback
+    def async_supports_options_flow(cls, config_entry):
+        """Return whether the entry has options; the household entry has none."""
+        return not config_entry.data.get(CONF_HOUSEHOLD)
+
     @callback
     @classmethod # 新增此行
     def async_get_options_flow(cls, config_entry): # 将 self 改为 cls
@@ -47,15 +187,43 @@ class ChinaUnicomDataOptionsFlow(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):
         """Handle options flow."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            openid = user_input["openid"]
+            changed = openid != get_entry_config(self.config_entry)["openid"]
+            if changed and openid_in_use(self.hass, openid, self.config_entry):
+                errors["openid"] = "already_configured"
+            else:
+                if changed:
+                    self.hass.config_entries.async_update_entry(self.config_entry, unique_id=openid)
+                else:
+                    self._sync_shared_settings(openid, user_input)
+                return self.async_create_entry(title="", data=user_input)
 
+        # 默认值取合并了选项的当前配置，未修改直接提交时不会恢复为最初的设置
+        config = get_entry_config(self.config_entry)
         options_schema = vol.Schema({
-            vol.Required("name", default=self.config_entry.data.get("name", "联通数据")): str,
-            vol.Required("openid", default=self.config_entry.data.get("openid")): str,
-            vol.Required("refresh_interval", default=self.config_entry.data.get("refresh_interval", 15)): vol.All(
+            vol.Required("name", default=config.get("name", "联通数据")): str,
+            vol.Required("openid", default=config.get("openid")): str,
+            vol.Required("refresh_interval", default=config.get("refresh_interval", 15)): vol.All(
                 vol.Coerce(int), vol.Range(min=1, max=60)
             ),
-            vol.Optional("create_individual_sensors", default=self.config_entry.data.get("create_individual_sensors", False)): bool,
+            vol.Optional("create_individual_sensors", default=config.get("create_individual_sensors", False)): bool,
+            vol.Optional("stale_grace", default=config.get("stale_grace", 0)): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=1440)
+            ),
         })
-        return self.async_show_form(step_id="init", data_schema=options_schema)
\ No newline at end of file
+        return self.async_show_form(step_id="init", data_schema=options_schema, errors=errors)
+
+    @callback
+    def _sync_shared_settings(self, openid, user_input):
+        """Copy the polling settings to the other entries sharing the OpenID's coordinator."""
+        # 升级前重复添加的条目共用一个协调器，刷新间隔和宽限期必须一致
+        shared = {key: user_input[key] for key in ("refresh_interval", "stale_grace") if key in user_input}
+        for other in self.hass.config_entries.async_entries(DOMAIN):
+            if (
+                other.entry_id != self.config_entry.entry_id
+                and not other.data.get(CONF_HOUSEHOLD)
+                and get_entry_config(other).get("openid") == openid
+            ):
+                self.hass.config_entries.async_update_entry(other, options={**other.options, **shared})
\ No newline at end of file
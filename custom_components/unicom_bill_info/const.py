@@ -0,0 +1,31 @@
+"""Constants for the China Unicom bill info integration."""
+
+DOMAIN = "unicom_bill_info"
+
+PLATFORMS = ["sensor"]
+
+# 家庭汇总条目的 data 中的标记和唯一 ID
+CONF_HOUSEHOLD = "household"
+HOUSEHOLD_UNIQUE_ID = "household"
+
+# 账户条目加载完成和卸载时发送的信号，参数为条目
+SIGNAL_ENTRY_LOADED = f"{DOMAIN}_entry_loaded"
+SIGNAL_ENTRY_UNLOADED = f"{DOMAIN}_entry_unloaded"
+
+# 以下默认值供 configuration.yaml 的校验使用，放在这里使集成在导入时不必加载对应模块
+
+DEFAULT_BASE_URL = "https://mina.10010.com/wxapplet/weixinNew"
+
+# 所有账户共享的请求速率
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_BURST = 10
+
+# 启动时各账户首次刷新的并发数和最小间隔（秒）
+DEFAULT_STARTUP_CONCURRENCY = 4
+DEFAULT_STARTUP_SPACING = 0.5
+
+# 快照导出
+DEFAULT_EXPORT_FLUSH_INTERVAL = 5
+DEFAULT_EXPORT_TOPIC_PREFIX = "unicom_bill_info"
+DEFAULT_EXPORT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_EXPORT_BACKUPS = 5
@@ -0,0 +1,564 @@
+"""Data update coordinator for China Unicom bill info."""
+import asyncio
+import bisect
+import collections
+import contextlib
+import hashlib
+import inspect
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant import config_entries
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import (
+    TimestampDataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    UnicomApiError,
+    UnicomAuthError,
+    UnicomRateLimitError,
+    AiohttpTransport,
+    UnicomClient,
+)
+from .const import DOMAIN
+from .ratelimit import PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED, RequestShed
+
+_LOGGER = logging.getLogger(__name__)
+
+# 协调器在 2024.11 起可显式指定所属条目
+_ACCEPTS_CONFIG_ENTRY = "config_entry" in inspect.signature(
+    TimestampDataUpdateCoordinator.__init__
+).parameters
+
+# 排队等待令牌的最长时间，超过则放弃本次请求
+REQUEST_DEADLINES = {
+    PRIORITY_INTERACTIVE: 30,
+    PRIORITY_SCHEDULED: 120,
+}
+
+# 一次刷新的总时限 = 排队期限 + 请求超时 + 余量，无论上游出现何种故障都不会超过
+REFRESH_DEADLINE_MARGIN = 5
+
+# 刷新耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 配置流程校验得到的数据在此时间内可直接用于首次刷新
+VALIDATED_SNAPSHOT_MAX_AGE = timedelta(minutes=5)
+
+# 被限流后轮询间隔按指数退避，最长不超过此值
+MAX_BACKOFF_INTERVAL = timedelta(hours=6)
+
+# 突发轮询模式下一次最多发出的请求数，避免失控
+MAX_BURST_REQUESTS = 120
+
+
+def get_entry_config(config_entry):
+    """Return the entry data with options applied on top."""
+    # 选项流程保存的值优先于初始配置
+    return {**config_entry.data, **config_entry.options}
+
+
+async def async_acquire_coordinator(hass, config_entry):
+    """Return the coordinator polling the entry's OpenID, shared between entries.
+
+    同一 OpenID 的多个条目共用一个协调器，只请求一次；刷新间隔和宽限期
+    取最近加载的条目的设置，选项流程会把它们同步到共用的条目。
+    """
+    openid = get_entry_config(config_entry)["openid"]
+    shared = hass.data[DOMAIN].setdefault("coordinators", {})
+    lock = hass.data[DOMAIN].setdefault("coordinator_locks", {}).setdefault(openid, asyncio.Lock())
+    async with lock:
+        coordinator = shared.get(openid)
+        if coordinator is None:
+            coordinator = await async_setup_coordinator(hass, config_entry)
+            shared[openid] = coordinator
+            # 家庭汇总条目可能在账户之后加载，届时由它接入已有的协调器
+            if household := hass.data[DOMAIN].get("household"):
+                household.track(coordinator)
+            coordinator.async_on_shutdown(lambda: _untrack_household(hass, coordinator))
+            if exporter := hass.data[DOMAIN].get("exporter"):
+                coordinator.async_on_shutdown(exporter.track(coordinator))
+            if metrics := hass.data[DOMAIN].get("metrics"):
+                coordinator.async_on_shutdown(metrics.track(coordinator, config_entry.title))
+        else:
+            config = get_entry_config(config_entry)
+            coordinator.async_apply_settings(
+                timedelta(minutes=config["refresh_interval"]),
+                timedelta(minutes=config.get("stale_grace", 0)),
+            )
+        coordinator.entry_ids.add(config_entry.entry_id)
+    return coordinator
+
+
+def _untrack_household(hass, coordinator):
+    """Drop a coordinator that shuts down from the household totals."""
+    if household := hass.data[DOMAIN].get("household"):
+        household.untrack(coordinator)
+
+
+async def async_release_coordinator(hass, config_entry):
+    """Stop using the entry's coordinator and shut it down once nothing uses it."""
+    coordinator = config_entry.runtime_data
+    coordinator.entry_ids.discard(config_entry.entry_id)
+    if not coordinator.entry_ids:
+        hass.data[DOMAIN]["coordinators"].pop(coordinator.openid, None)
+        await coordinator.async_shutdown()
+
+
+async def async_setup_coordinator(hass, config_entry):
+    """Create the coordinator for an entry and load its first snapshot."""
+    config = get_entry_config(config_entry)
+    openid = config["openid"]
+    refresh_interval = config["refresh_interval"]
+    stale_grace = timedelta(minutes=config.get("stale_grace", 0))
+    scan_interval_td = timedelta(minutes=refresh_interval)
+
+    transport = AiohttpTransport(async_get_clientsession(hass))
+    if record_dir := hass.data[DOMAIN]["config"].get("record_dir"):
+        from .replay import RecordingTransport
+
+        transport = RecordingTransport(transport, hass.config.path(record_dir))
+    if archive := hass.data[DOMAIN].get("archive"):
+        from .archive import ArchivingTransport
+
+        transport = ArchivingTransport(transport, archive)
+    client = UnicomClient(transport, endpoints=hass.data[DOMAIN]["endpoints"])
+    limiter = hass.data[DOMAIN]["limiter"]
+
+    coordinator = ChinaUnicomDataUpdateCoordinator(
+        hass,
+        client,
+        openid,
+        _LOGGER,
+        scan_interval_td,
+        DOMAIN,
+        stale_grace,
+        limiter,
+    )
+
+    # 配置流程刚校验过的数据直接使用，避免再请求一次
+    validated = hass.data[DOMAIN].get("validated_snapshots", {}).pop(openid, None)
+    if validated is not None and dt_util.utcnow() - validated[1] < VALIDATED_SNAPSHOT_MAX_AGE:
+        coordinator.async_seed(*validated)
+    else:
+        # 启动时大量账户同时首次刷新，经准入队列错开
+        async with hass.data[DOMAIN]["admission"].slot():
+            await coordinator.async_first_refresh()
+    return coordinator
+
+
+def changed_keys(previous, current):
+    """Return the snapshot keys whose values differ between two snapshots."""
+    return {
+        key for key in previous.keys() | current.keys()
+        if previous.get(key) != current.get(key)
+    }
+
+
+def poll_phase(openid, period):
+    """Return a stable offset in seconds within period for an account.
+
+    由 OpenID 的哈希决定，重启后保持不变，使各账户的轮询均匀分布在间隔内。
+    """
+    digest = hashlib.sha1(openid.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % max(int(period), 1)
+
+
+class LatencyHistogram:
+    """Histogram of refresh durations in seconds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Initialize with the bucket upper bounds."""
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # 各桶自身的计数，超过最大桶的只计入 count
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one duration."""
+        self.count += 1
+        self.sum += value
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+
+class ChinaUnicomDataUpdateCoordinator(TimestampDataUpdateCoordinator):
+    """Class to manage fetching China Unicom Data."""
+
+    def __init__(self, hass, client, openid, logger, update_interval, domain, stale_grace=timedelta(0), limiter=None):
+        """Initialize."""
+        self.openid = openid
+        self.client = client
+        self._domain = domain
+        self.stale_grace = stale_grace
+        self._unsub_stale_expiry = None
+        self.limiter = limiter
+        self._request_priority = PRIORITY_SCHEDULED
+        self._base_update_interval = update_interval
+        self._backoff_level = 0
+        self._phase = poll_phase(openid, update_interval.total_seconds())
+        self._notified_data = None
+        self._notified_success = None
+        self._burst_interval = None
+        self._burst_until = None
+        self._burst_budget = 0
+        self._fetch_task = None
+        self.entry_ids = set()
+        self._on_shutdown = []
+        self._auth_failed = False
+        # 运行统计，供 metrics 接口使用
+        self.refresh_count = 0
+        self.refresh_latency = LatencyHistogram()
+        self.error_counts = collections.Counter()
+        self.suppressed_updates = 0
+        # 协调器由同一 OpenID 的所有条目共享，不属于创建它的条目：
+        # 卸载、重新认证和轮询开关都按 entry_ids 处理
+        if _ACCEPTS_CONFIG_ENTRY:
+            super().__init__(
+                hass,
+                logger,
+                name="China Unicom Data",
+                update_interval=update_interval,
+                config_entry=None,
+            )
+        else:
+            # 2024.11 之前的版本没有 config_entry 参数，只能从上下文取当前条目
+            token = config_entries.current_entry.set(None)
+            try:
+                super().__init__(
+                    hass,
+                    logger,
+                    name="China Unicom Data",
+                    update_interval=update_interval,
+                )
+            finally:
+                config_entries.current_entry.reset(token)
+        self.update_interval = self._phase_aligned_interval()
+
+    @property
+    def domain(self):
+        """Return the domain of the integration."""
+        return self._domain
+
+    @property
+    def data_age(self):
+        """Return how old the last successfully fetched data is."""
+        if self.last_update_success_time is None:
+            return None
+        return dt_util.utcnow() - self.last_update_success_time
+
+    @property
+    def is_stale(self):
+        """Return True while serving data from before a failed refresh."""
+        return not self.last_update_success and self.data is not None
+
+    @property
+    def entities_available(self):
+        """Return if entities should report available.
+
+        刷新失败后，在宽限期内继续提供上次的数据，超过宽限期才变为不可用。
+        """
+        if self.last_update_success:
+            return True
+        age = self.data_age
+        return self.data is not None and age is not None and age < self.stale_grace
+
+    def staleness_attributes(self):
+        """Return the attributes added to entities while data is stale."""
+        if not self.is_stale:
+            return {}
+        age = self.data_age
+        return {
+            "stale": True,
+            "data_age": int(age.total_seconds()) if age is not None else None,
+        }
+
+    async def async_first_refresh(self):
+        """Refresh for the first time, raising ConfigEntryNotReady on failure.
+
+        与 async_config_entry_first_refresh 相同，但不要求协调器属于某个条目。
+        """
+        await self._async_refresh(
+            log_failures=False, raise_on_auth_failed=True, raise_on_entry_error=True
+        )
+        if self.last_update_success:
+            return
+        raise ConfigEntryNotReady(str(self.last_exception)) from self.last_exception
+
+    async def _async_refresh(self, *args, **kwargs):
+        """Refresh data and arm the grace expiry timer on failure."""
+        self._auth_failed = False
+        await super()._async_refresh(*args, **kwargs)
+        self.refresh_count += 1
+        if self._auth_failed:
+            self._async_start_reauth()
+        if not self.last_update_success and self.last_exception is not None:
+            cause = self.last_exception.__cause__ or self.last_exception
+            self.error_counts[type(cause).__name__] += 1
+        if self.last_update_success or not self.stale_grace:
+            self._cancel_stale_expiry()
+            return
+        if self._unsub_stale_expiry is None:
+            self._arm_stale_expiry()
+
+    @callback
+    def _arm_stale_expiry(self):
+        """Notify the entities once the grace period of the last data runs out."""
+        # 连续失败时协调器不会再通知实体，需要定时在宽限期结束时通知一次
+        age = self.data_age or timedelta(0)
+        self._unsub_stale_expiry = async_call_later(
+            self.hass, max(self.stale_grace - age, timedelta(0)), self._handle_stale_expiry
+        )
+
+    @callback
+    def async_apply_settings(self, update_interval, stale_grace):
+        """Switch to the polling settings of an entry that (re)loaded with this coordinator.
+
+        共用协调器的条目设置不同时，以最近加载的条目为准。
+        """
+        if update_interval == self._base_update_interval and stale_grace == self.stale_grace:
+            return
+        self._base_update_interval = update_interval
+        self._phase = poll_phase(self.openid, update_interval.total_seconds())
+        if not self._backoff_level and not self.burst_active:
+            self.update_interval = self._phase_aligned_interval()
+            if self._unsub_refresh is not None:
+                self._schedule_refresh()
+        if stale_grace != self.stale_grace:
+            self.stale_grace = stale_grace
+            self._cancel_stale_expiry()
+            if not self.last_update_success and stale_grace:
+                self._arm_stale_expiry()
+            self.async_update_all_listeners()
+
+    @callback
+    def _async_start_reauth(self):
+        """Ask for a new OpenID on every entry using the coordinator."""
+        for entry_id in self.entry_ids:
+            if entry := self.hass.config_entries.async_get_entry(entry_id):
+                entry.async_start_reauth(self.hass)
+
+    @callback
+    def _schedule_refresh(self):
+        """Schedule the next poll unless every entry using the coordinator disabled polling."""
+        entries = [self.hass.config_entries.async_get_entry(entry_id) for entry_id in self.entry_ids]
+        if entries and all(entry is not None and entry.pref_disable_polling for entry in entries):
+            return
+        super()._schedule_refresh()
+
+    @callback
+    def _handle_stale_expiry(self, _now):
+        """Mark entities unavailable once the grace period has run out."""
+        self._unsub_stale_expiry = None
+        if not self.last_update_success:
+            self.async_update_all_listeners()
+
+    @callback
+    def _cancel_stale_expiry(self):
+        """Cancel a pending grace expiry."""
+        if self._unsub_stale_expiry is not None:
+            self._unsub_stale_expiry()
+            self._unsub_stale_expiry = None
+
+    @callback
+    def async_on_shutdown(self, func):
+        """Call func when the coordinator shuts down."""
+        self._on_shutdown.append(func)
+
+    @callback
+    def async_update_listeners(self):
+        """Notify only the listeners whose snapshot keys changed.
+
+        监听器的 context 为其依赖的字段集合（None 表示全部）。
+        可用性变化或没有可比较的旧数据时通知所有监听器。
+        """
+        previous, self._notified_data = self._notified_data, self.data
+        success_changed = self.last_update_success != self._notified_success
+        self._notified_success = self.last_update_success
+        if success_changed or previous is None or self.data is None:
+            super().async_update_listeners()
+            return
+
+        changed = changed_keys(previous, self.data)
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or not changed.isdisjoint(context):
+                update_callback()
+            else:
+                self.suppressed_updates += 1
+
+    @callback
+    def async_update_all_listeners(self):
+        """Notify every listener regardless of what changed."""
+        self._notified_data = self.data
+        self._notified_success = self.last_update_success
+        super().async_update_listeners()
+
+    async def async_shutdown(self):
+        """Cancel timers and the in-flight fetch when the coordinator is shut down."""
+        while self._on_shutdown:
+            self._on_shutdown.pop()()
+        self._cancel_stale_expiry()
+        self._end_burst()
+        await super().async_shutdown()
+        task, self._fetch_task = self._fetch_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            # 等待请求真正结束，连接归还给连接池后再返回
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    @property
+    def burst_active(self):
+        """Return True while a burst polling window is running."""
+        return (
+            self._burst_until is not None
+            and self._burst_budget > 0
+            and dt_util.utcnow() < self._burst_until
+        )
+
+    async def async_start_burst(self, interval, duration):
+        """Poll usage every interval for duration, then return to normal.
+
+        突发模式只查询 sspbigball，请求数受 MAX_BURST_REQUESTS 限制，并且仍经过共享限流器。
+        """
+        self._burst_interval = interval
+        self._burst_until = dt_util.utcnow() + duration
+        self._burst_budget = min(int(duration / interval) + 1, MAX_BURST_REQUESTS)
+        self.logger.info(
+            "Burst polling %s every %s for %s (at most %d requests)",
+            self.name, interval, duration, self._burst_budget,
+        )
+        await self.async_request_refresh()
+
+    def _end_burst(self):
+        """Leave burst mode and resume the normal poll phase."""
+        if self._burst_until is None:
+            return
+        self._burst_interval = None
+        self._burst_until = None
+        self._burst_budget = 0
+        self.logger.info("Burst polling %s finished", self.name)
+
+    async def _async_update_usage(self):
+        """Fetch only usage during a burst and merge it into the last snapshot."""
+        self._burst_budget -= 1
+        self.update_interval = self._burst_interval
+        usage = await self.client.async_fetch_usage(
+            self.openid,
+            before_request=lambda: self._async_acquire_request_slot(PRIORITY_SCHEDULED),
+        )
+        return {**self.data, **usage}
+
+    async def async_request_interactive_refresh(self):
+        """Request a refresh that jumps ahead of scheduled polls."""
+        self._request_priority = PRIORITY_INTERACTIVE
+        await self.async_request_refresh()
+
+    async def _async_acquire_request_slot(self, priority):
+        """Wait for the shared rate limiter before sending a request."""
+        if self.limiter is None:
+            return
+        await self.limiter.acquire(priority, REQUEST_DEADLINES.get(priority))
+
+    def _apply_backoff(self, err):
+        """Slow down polling after the upstream throttled us."""
+        self._end_burst()
+        self._backoff_level += 1
+        interval = min(
+            self._base_update_interval * (2 ** self._backoff_level), MAX_BACKOFF_INTERVAL
+        )
+        self.update_interval = max(interval, self._base_update_interval)
+        pause = err.retry_after or interval.total_seconds()
+        if self.limiter is not None:
+            self.limiter.pause(min(pause, MAX_BACKOFF_INTERVAL.total_seconds()))
+        self.logger.warning(
+            "Rate limited by 10010 API, next poll in %s: %s", self.update_interval, err
+        )
+
+    def _reset_backoff(self):
+        """Return to the configured interval after a successful poll."""
+        self._backoff_level = 0
+        if not self.burst_active:
+            self.update_interval = self._phase_aligned_interval()
+
+    def _phase_aligned_interval(self):
+        """Return the delay until this account's next poll slot.
+
+        轮询时刻对齐到 phase + n * 间隔；距离下一个时刻不足半个间隔时顺延一轮，
+        避免启动后的首次刷新与第一次定时轮询挨得太近。
+        """
+        period = self._base_update_interval.total_seconds()
+        now = time.time()
+        delay = period - (now - self._phase) % period
+        if delay < period / 2:
+            delay += period
+        return timedelta(seconds=delay)
+
+    @callback
+    def async_seed(self, data, fetched_at):
+        """Use a snapshot fetched elsewhere (e.g. by the config flow) as current data."""
+        self.last_update_success_time = fetched_at
+        self.update_interval = self._phase_aligned_interval()
+        self.async_set_updated_data(data)
+
+    async def _async_update_data(self):
+        """Fetch data from API endpoint."""
+        priority = self._request_priority
+        self._request_priority = PRIORITY_SCHEDULED
+        burst = self.burst_active and self.data is not None
+        if not burst:
+            self._end_burst()
+        if not self._backoff_level and not burst:
+            # 本次刷新结束后按此间隔安排下一次，保持在本账户的轮询相位上
+            self.update_interval = self._phase_aligned_interval()
+
+        deadline = (
+            REQUEST_DEADLINES.get(priority, 0) + self.client.timeout + REFRESH_DEADLINE_MARGIN
+        )
+        if burst:
+            fetch = self._async_update_usage()
+        else:
+            fetch = self.client.async_fetch(
+                self.openid,
+                before_request=lambda: self._async_acquire_request_slot(priority),
+            )
+        # 请求在单独的任务中进行，卸载时 async_shutdown 可以取消并等待它
+        self._fetch_task = asyncio.ensure_future(fetch)
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(deadline):
+                result = await self._fetch_task
+        except asyncio.CancelledError as err:
+            if asyncio.current_task().cancelling():
+                raise
+            raise UpdateFailed("Refresh cancelled because the entry is unloading") from err
+        except UnicomAuthError as err:
+            # 停止轮询并发起重新认证，等待用户输入新的 OpenID
+            self._auth_failed = True
+            raise ConfigEntryAuthFailed(f"OpenID rejected by 10010 API: {err}") from err
+        except UnicomRateLimitError as err:
+            self._apply_backoff(err)
+            raise UpdateFailed(f"Rate limited: {err}") from err
+        except UnicomApiError as err:
+            raise UpdateFailed(f"Error fetching data: {err}") from err
+        except RequestShed as err:
+            raise UpdateFailed(f"Skipped, rate limit queue is full: {err}") from err
+        except TimeoutError as err:
+            raise UpdateFailed(f"Refresh did not finish within {deadline}s") from err
+        except Exception as err:
+            self.logger.exception("Unexpected error refreshing %s", self.name)
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+        finally:
+            self._fetch_task = None
+            self.refresh_latency.observe(time.monotonic() - started)
+
+        self._reset_backoff()
+        return result
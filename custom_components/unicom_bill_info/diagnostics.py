@@ -0,0 +1,41 @@
+"""Diagnostics support for China Unicom bill info.
+
+Home Assistant imports this module only when diagnostics are requested.
+"""
+from homeassistant.components.diagnostics import async_redact_data
+
+from .const import CONF_HOUSEHOLD
+from .coordinator import get_entry_config
+from .household import MIN_HEADROOM, SUM_KEYS
+
+TO_REDACT = {"openid"}
+
+
+async def async_get_config_entry_diagnostics(hass, config_entry):
+    """Return diagnostics for a config entry."""
+    if config_entry.data.get(CONF_HOUSEHOLD):
+        household = config_entry.runtime_data
+        return {
+            "accounts": household.account_count,
+            "totals": {key: household.value(key) for key in (*SUM_KEYS, MIN_HEADROOM)},
+        }
+
+    coordinator = config_entry.runtime_data
+    limiter = coordinator.limiter
+    return {
+        "config": async_redact_data(get_entry_config(config_entry), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_update_success_time": coordinator.last_update_success_time,
+            "last_exception": repr(coordinator.last_exception),
+            "update_interval": str(coordinator.update_interval),
+            "stale": coordinator.is_stale,
+        },
+        "limiter": {
+            "queue_depth": limiter.queue_depth,
+            "peak_depth": limiter.peak_depth,
+            "shed_count": limiter.shed_count,
+        } if limiter is not None else None,
+        "endpoints": coordinator.client.endpoints.status(),
+        "data": coordinator.data,
+    }
@@ -0,0 +1,94 @@
+"""Base entity shared by all China Unicom sensors."""
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+
+from .coordinator import ChinaUnicomDataUpdateCoordinator
+
+
+class ChinaUnicomBaseSensor(SensorEntity):
+    """Common behaviour shared by all China Unicom sensors.
+
+    子类通过 _key 指定读取的快照字段，_label 和 _suffix 分别组成实体名称和唯一 ID。
+    读取多个字段的子类用 _watched_keys 列出全部字段，协调器只在这些字段变化时通知实体。
+    与其他条目共享 OpenID 的条目设置 account_id，使实体和设备的标识互不冲突。
+    """
+
+    _key = None
+    _label = None
+    _suffix = None
+    _watched_keys = None
+    account_id = None
+
+    def __init__(self, coordinator: ChinaUnicomDataUpdateCoordinator, base_name: str):
+        """Initialize the sensor."""
+        self.coordinator = coordinator
+        self._base_name = base_name
+        self._state = None
+        self._attributes = {}
+
+    @property
+    def watched_keys(self):
+        """Return the snapshot keys this entity depends on, or None for all."""
+        if self._watched_keys is not None:
+            return self._watched_keys
+        return None if self._key is None else frozenset((self._key,))
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return f"{self._base_name} {self._label}"
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this sensor."""
+        return f"china_unicom_{self.account_id or self.coordinator.openid}_{self._suffix}"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._state
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        stale = self.coordinator.staleness_attributes()
+        if not stale:
+            return self._attributes
+        return {**self._attributes, **stale}
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return DeviceInfo(
+            identifiers={(self.coordinator.domain, self.account_id or self.coordinator.openid)},
+            name=self._base_name,
+            manufacturer="China Unicom",
+        )
+
+    @property
+    def should_poll(self) -> bool:
+        """No need to poll. Coordinator polls and pushes updates."""
+        return False
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return self.coordinator.entities_available
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self._handle_coordinator_update, self.watched_keys)
+        )
+        self._handle_coordinator_update()
+
+    async def async_update(self):
+        """Handle a manual refresh (homeassistant.update_entity)."""
+        await self.coordinator.async_request_interactive_refresh()
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator."""
+        self._state = self.coordinator.data.get(self._key)
+        self.async_write_ha_state()
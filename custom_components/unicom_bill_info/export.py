@@ -0,0 +1,197 @@
+"""Export parsed snapshots to MQTT or a rotating JSON Lines file.
+
+快照在 flush_interval 秒内按账户合并，只发送数值有变化的账户，一次刷新写出一批。
+本模块不依赖 Home Assistant：MQTT 发布函数由调用方传入，测试时可换成本地替身。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from .const import (
+    DEFAULT_EXPORT_BACKUPS,
+    DEFAULT_EXPORT_FLUSH_INTERVAL,
+    DEFAULT_EXPORT_MAX_BYTES,
+    DEFAULT_EXPORT_TOPIC_PREFIX,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# 写入失败后重发的间隔（秒）
+RETRY_INTERVAL = 30
+
+
+def account_key(openid):
+    """Return a stable identifier for an account that does not reveal the OpenID."""
+    return hashlib.sha1(openid.encode("utf-8")).hexdigest()[:12]
+
+
+class MqttSink:
+    """Publish each snapshot as a retained JSON message per account."""
+
+    def __init__(self, publish, topic_prefix=DEFAULT_EXPORT_TOPIC_PREFIX, qos=0, retain=True):
+        """Initialize with an async publish(topic, payload, qos, retain) callable."""
+        self.publish = publish
+        self.topic_prefix = topic_prefix
+        self.qos = qos
+        self.retain = retain
+
+    async def async_write(self, records):
+        """Publish a batch of records."""
+        await asyncio.gather(*(
+            self.publish(
+                f"{self.topic_prefix}/{record['account']}/snapshot",
+                json.dumps(record, ensure_ascii=False),
+                self.qos,
+                self.retain,
+            )
+            for record in records
+        ))
+
+
+class JsonlFileSink:
+    """Append records to a JSON Lines file, rotating it by size."""
+
+    def __init__(self, path, max_bytes=DEFAULT_EXPORT_MAX_BYTES, backups=DEFAULT_EXPORT_BACKUPS):
+        """Initialize with the file path and rotation limits."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    async def async_write(self, records):
+        """Write a batch of records without blocking the event loop."""
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+    def _write(self, lines):
+        """Append lines, rotating first when the file would grow past max_bytes."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(lines.encode("utf-8")) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def _rotate(self):
+        """Shift path -> path.1 -> path.2 ..., dropping the oldest."""
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class SnapshotExporter:
+    """Batch changed snapshots across accounts and hand them to the sinks.
+
+    写入失败的记录按输出端保留（每个账户只保留最新一条），retry_interval 秒后只向失败的输出端重发；
+    所有输出端都写入成功后才记为已发送。
+    """
+
+    def __init__(self, sinks, flush_interval=DEFAULT_EXPORT_FLUSH_INTERVAL, retry_interval=RETRY_INTERVAL):
+        """Initialize with the sinks, the flush window and the retry delay in seconds."""
+        self.sinks = sinks
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self._sent = {}  # account -> 所有输出端都已写入的快照
+        self._pending = {}  # account -> record
+        self._failed = {}  # sink -> {account: record}，等待重发
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self._flushing = set()
+        self.batches = 0
+        self.suppressed = 0
+
+    def submit(self, account, snapshot):
+        """Queue a snapshot unless it equals the last one exported or queued."""
+        pending = self._pending.get(account)
+        if snapshot is None or snapshot == self._sent.get(account) or (
+            pending is not None and pending["data"] == snapshot
+        ):
+            self.suppressed += 1
+            return
+        self._pending[account] = {"account": account, "time": time.time(), "data": snapshot}
+        self._schedule(self.flush_interval)
+
+    def _schedule(self, delay):
+        """Flush after delay unless a flush is already scheduled."""
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        """Flush from the timer callback."""
+        self._timer = None
+        task = asyncio.ensure_future(self.async_flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def async_flush(self, *_):
+        """Write all pending and previously failed records to the sinks now."""
+        # 定时刷新与停止时的刷新可能同时发生，逐个进行，避免同一记录交错写入
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            records, self._pending = self._pending, {}
+            batches = {}
+            for sink in self.sinks:
+                # 新记录覆盖同一账户等待重发的旧记录
+                if batch := {**self._failed.pop(sink, {}), **records}:
+                    batches[sink] = batch
+            if not batches:
+                return
+            self.batches += 1
+            results = await asyncio.gather(
+                *(sink.async_write(list(batch.values())) for sink, batch in batches.items()),
+                return_exceptions=True,
+            )
+            delivered = {}
+            for (sink, batch), result in zip(batches.items(), results):
+                delivered.update(batch)
+                if isinstance(result, Exception):
+                    _LOGGER.warning(
+                        "Export to %s failed, retrying in %ss: %s",
+                        type(sink).__name__, self.retry_interval, result,
+                    )
+                    self._failed[sink] = batch
+            # 所有输出端都已写入的记录才算已发送，之后相同的快照不再发送
+            for account, record in delivered.items():
+                if not any(account in failed for failed in self._failed.values()):
+                    self._sent[account] = record["data"]
+            if self._failed:
+                self._schedule(max(self.flush_interval, self.retry_interval))
+
+    def forget(self, account):
+        """Drop the state of an account that is no longer polled."""
+        self._sent.pop(account, None)
+        self._pending.pop(account, None)
+        for failed in self._failed.values():
+            failed.pop(account, None)
+
+    def track(self, coordinator):
+        """Export the snapshots of a coordinator; return a function that stops it."""
+        account = account_key(coordinator.openid)
+
+        def _update():
+            if coordinator.last_update_success:
+                self.submit(account, coordinator.data)
+
+        _update()
+        unsub = coordinator.async_add_listener(_update)
+
+        def _stop():
+            unsub()
+            self.forget(account)
+
+        return _stop
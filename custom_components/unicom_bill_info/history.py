@@ -0,0 +1,281 @@
+"""Monthly bill and usage history kept in a local store.
+
+每个账户按自然月保存一条汇总（当月最后一次观察到的快照），当前月随每次刷新更新，
+月份结束后即固定下来。历史数据保存在 .storage 中，通过长期统计和
+unicom_bill_info.get_history 服务提供，查询时不会访问联通接口。
+
+联通接口没有公开的历史账单查询，默认只记录集成运行期间观察到的月份；
+配置 history_file 后从 CSV 文件回填更早的月份，只有本地缺失的月份才会被查询。
+"""
+import abc
+import asyncio
+import csv
+import logging
+import os
+from datetime import datetime
+
+import voluptuous as vol
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+# 回填的最早月份数
+HISTORY_MONTHS = 12
+
+# 汇总字段：快照字段 -> (统计名称, 单位)
+HISTORY_FIELDS = {
+    "voice_used": ("语音用量", "min"),
+    "sms_used": ("短信用量", None),
+    "data_used": ("流量用量", "MB"),
+    "real_fee": ("实时话费", "CNY"),
+}
+
+
+def month_key(moment):
+    """Return the 'YYYY-MM' key of a datetime in local time."""
+    return dt_util.as_local(moment).strftime("%Y-%m")
+
+
+def past_months(now, count):
+    """Return the keys of the count months before the month of now, newest first."""
+    year, month = now.year, now.month
+    keys = []
+    for _ in range(count):
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        keys.append(f"{year:04d}-{month:02d}")
+    return keys
+
+
+def summarize(snapshot):
+    """Return the monthly summary fields of a snapshot."""
+    return {key: snapshot.get(key) for key in HISTORY_FIELDS}
+
+
+class HistorySource(abc.ABC):
+    """Source of summaries for months the integration did not observe."""
+
+    @abc.abstractmethod
+    async def async_revision(self):
+        """Return a JSON-serializable value that changes whenever the source's content changes.
+
+        来源变化后，之前查询过但没有数据的月份会重新查询。
+        """
+
+    @abc.abstractmethod
+    async def async_fetch_month(self, openid, month):
+        """Return the summary of a past month, or None if it is unknown."""
+
+
+HISTORY_ROW_SCHEMA = vol.Schema({
+    vol.Required("openid"): vol.All(str, vol.Strip, vol.Length(min=1)),
+    vol.Required("month"): vol.All(str, vol.Strip, vol.Match(r"^\d{4}-\d{2}$")),
+    **{vol.Optional(key): vol.Coerce(float) for key in HISTORY_FIELDS},
+}, extra=vol.REMOVE_EXTRA)
+
+
+def read_history_csv(path):
+    """Return {(openid, month): summary} from a CSV file of past monthly bills."""
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        rows = [
+            HISTORY_ROW_SCHEMA({key: value for key, value in row.items() if value not in (None, "")})
+            for row in csv.DictReader(file)
+        ]
+    return {(row["openid"], row["month"]): summarize(row) for row in rows}
+
+
+class CsvHistorySource(HistorySource):
+    """History source backed by a CSV file, e.g. exported from the 10010 app."""
+
+    def __init__(self, hass, path):
+        """Initialize with the path of the CSV file."""
+        self.hass = hass
+        self.path = path
+        self._mtime = None
+        self._months = {}
+        self._lock = asyncio.Lock()
+
+    def _load(self):
+        """Read the file again if it changed since the last read."""
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            self._months = read_history_csv(self.path)
+            self._mtime = mtime
+
+    async def _async_load(self):
+        """Read the file in the executor if it changed."""
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._load)
+
+    async def async_revision(self):
+        """Return the modification time of the file."""
+        await self._async_load()
+        return self._mtime
+
+    async def async_fetch_month(self, openid, month):
+        """Return the summary of a month listed in the file."""
+        await self._async_load()
+        return self._months.get((openid, month))
+
+
+def history_store(hass, entry):
+    """Return the store holding the history of an entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.history.{entry.entry_id}")
+
+
+class AccountHistory:
+    """Monthly summaries of one account."""
+
+    def __init__(self, hass, entry, coordinator, source=None):
+        """Initialize the history of a config entry."""
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self.source = source
+        self._store = history_store(hass, entry)
+        # month -> {"final": bool, 字段...}
+        self.months = {}
+        # 已向来源查询过但没有数据的月份，来源的版本不变时不再重复请求
+        self._missing = set()
+        self._missing_revision = None
+        self._published = {}
+
+    async def async_load(self):
+        """Load the stored history."""
+        stored = await self._store.async_load() or {}
+        self.months = stored.get("months", {})
+        self._missing = set(stored.get("missing", ()))
+        self._missing_revision = stored.get("missing_revision")
+
+    @callback
+    def _data_to_save(self):
+        """Return the data written to the store."""
+        return {
+            "months": self.months,
+            "missing": sorted(self._missing),
+            "missing_revision": self._missing_revision,
+        }
+
+    @callback
+    def async_observe(self):
+        """Record the current snapshot as this month's summary."""
+        data = self.coordinator.data
+        if not self.coordinator.last_update_success or data is None:
+            return
+        now = dt_util.now()
+        current = month_key(now)
+        for month, summary in self.months.items():
+            if month < current and not summary.get("final"):
+                summary["final"] = True
+        summary = {**summarize(data), "final": False}
+        if self.months.get(current) == summary:
+            return
+        self.months[current] = summary
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        self.async_publish_statistics()
+
+    def unsynced_months(self, now=None):
+        """Return the past months missing locally and not known to be empty."""
+        now = now or dt_util.now()
+        return [
+            month for month in past_months(now, HISTORY_MONTHS)
+            if month not in self.months and month not in self._missing
+        ]
+
+    async def async_sync(self):
+        """Fetch the months missing from the store from the history source."""
+        if self.source is None:
+            return
+        missing = (set(self._missing), self._missing_revision)
+        fetched = 0
+        try:
+            revision = await self.source.async_revision()
+            if revision != self._missing_revision:
+                # 来源更新后（例如 CSV 文件补充了月份）重新查询之前没有数据的月份
+                self._missing.clear()
+                self._missing_revision = revision
+            for month in self.unsynced_months():
+                summary = await self.source.async_fetch_month(self.coordinator.openid, month)
+                if summary is None:
+                    self._missing.add(month)
+                else:
+                    self.months[month] = {**summarize(summary), "final": True}
+                    fetched += 1
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Could not fetch history: %s", err)
+        if fetched or missing != (self._missing, self._missing_revision):
+            self._store.async_delay_save(self._data_to_save, 0)
+        if fetched:
+            _LOGGER.debug("Backfilled %d months of history", fetched)
+            self.async_publish_statistics()
+
+    def query(self, months=None):
+        """Return stored summaries, newest first."""
+        keys = sorted(self.months, reverse=True)
+        if months is not None:
+            keys = keys[:months]
+        return [{"month": month, **self.months[month]} for month in keys]
+
+    @callback
+    def async_publish_statistics(self):
+        """Import the monthly summaries as external statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        name = self.entry.data.get("name", DOMAIN)
+        for key, (label, unit) in HISTORY_FIELDS.items():
+            rows = []
+            for month, summary in sorted(self.months.items()):
+                value = summary.get(key)
+                if value is None or self._published.get((key, month)) == value:
+                    continue
+                self._published[(key, month)] = value
+                year, mon = map(int, month.split("-"))
+                start = datetime(year, mon, 1, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+                rows.append({"start": start, "state": value})
+            if not rows:
+                continue
+            metadata = {
+                "source": DOMAIN,
+                "statistic_id": f"{DOMAIN}:{self.entry.entry_id.lower()}_{key}",
+                "name": f"{name} {label}",
+                "unit_of_measurement": unit,
+                "has_mean": False,
+                "has_sum": False,
+            }
+            async_add_external_statistics(self.hass, metadata, rows)
+
+    async def async_unload(self):
+        """Write pending changes to the store."""
+        await self._store.async_save(self._data_to_save())
+
+
+async def async_setup_history(hass, entry, coordinator, source=None):
+    """Load the history of an entry and keep it updated from the coordinator."""
+    history = AccountHistory(hass, entry, coordinator, source)
+    await history.async_load()
+    history.async_observe()
+    history.async_publish_statistics()
+    entry.async_on_unload(
+        coordinator.async_add_listener(history.async_observe, frozenset(HISTORY_FIELDS))
+    )
+    if source is not None:
+        entry.async_create_background_task(
+            hass, history.async_sync(), f"{DOMAIN} history sync {entry.entry_id}"
+        )
+    entry.async_on_unload(history.async_unload)
+    return history
+
+
+async def async_remove_history(hass, entry):
+    """Delete the stored history of a removed entry."""
+    await history_store(hass, entry).async_remove()
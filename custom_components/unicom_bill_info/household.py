@@ -0,0 +1,150 @@
+"""Household totals across all configured accounts.
+
+每个账户刷新时只减去它原来的贡献、加上新的贡献，更新代价与账户数量无关；
+最小剩余流量用带延迟删除的最小堆维护。
+"""
+import heapq
+import itertools
+
+# 求和的快照字段
+SUM_KEYS = ("balance", "real_fee", "data_used")
+# 取最小值的快照字段，及其在汇总中的名称
+HEADROOM_KEY = "data_available"
+MIN_HEADROOM = "min_headroom"
+
+HOUSEHOLD_KEYS = frozenset((*SUM_KEYS, HEADROOM_KEY))
+
+
+class HouseholdAggregate:
+    """Incrementally maintained sums and minimum headroom."""
+
+    def __init__(self):
+        """Initialize an empty household."""
+        self._contributions = {}  # account -> {key: value}
+        self._sums = dict.fromkeys(SUM_KEYS, 0.0)
+        self._counts = dict.fromkeys(SUM_KEYS, 0)
+        self._heap = []  # (headroom, seq, account)，过期条目在取最小值时丢弃
+        self._headroom = {}  # account -> (headroom, seq)
+        self._seq = itertools.count()
+        self._listeners = {}
+        self._tracked = {}  # account -> (coordinator, 停止跟踪的函数)
+
+    @property
+    def account_count(self):
+        """Return the number of accounts followed."""
+        return len(self._tracked)
+
+    def value(self, key):
+        """Return the current total of a key, or the minimum headroom."""
+        if key == MIN_HEADROOM:
+            return self._min_headroom()
+        if not self._counts[key]:
+            return None
+        return round(self._sums[key], 2)
+
+    def update(self, account, snapshot):
+        """Replace the contribution of one account with its latest snapshot."""
+        old = self._contributions.get(account, {})
+        new = {key: snapshot.get(key) for key in HOUSEHOLD_KEYS} if snapshot else {}
+        changed = set()
+        for key in SUM_KEYS:
+            before, after = old.get(key), new.get(key)
+            if before == after:
+                continue
+            if before is not None:
+                self._sums[key] -= before
+                self._counts[key] -= 1
+            if after is not None:
+                self._sums[key] += after
+                self._counts[key] += 1
+            if not self._counts[key]:
+                # 没有账户时清零，丢弃浮点累计误差
+                self._sums[key] = 0.0
+            changed.add(key)
+
+        if old.get(HEADROOM_KEY) != new.get(HEADROOM_KEY):
+            before = self._min_headroom()
+            self._set_headroom(account, new.get(HEADROOM_KEY))
+            if self._min_headroom() != before:
+                changed.add(MIN_HEADROOM)
+
+        if new:
+            self._contributions[account] = new
+        else:
+            self._contributions.pop(account, None)
+        self._notify(changed)
+
+    def remove(self, account):
+        """Drop an account from the household."""
+        self.update(account, None)
+
+    def _set_headroom(self, account, headroom):
+        """Record the headroom of an account, leaving old heap entries to go stale."""
+        if headroom is None:
+            self._headroom.pop(account, None)
+            return
+        seq = next(self._seq)
+        self._headroom[account] = (headroom, seq)
+        heapq.heappush(self._heap, (headroom, seq, account))
+        if len(self._heap) > 2 * len(self._headroom) + 16:
+            # 过期条目过多时重建，堆的大小保持与账户数同阶
+            self._heap = [(value, seq, key) for key, (value, seq) in self._headroom.items()]
+            heapq.heapify(self._heap)
+
+    def _min_headroom(self):
+        """Return the smallest current headroom, discarding stale heap entries."""
+        while self._heap:
+            headroom, seq, account = self._heap[0]
+            if self._headroom.get(account) == (headroom, seq):
+                return headroom
+            heapq.heappop(self._heap)
+        return None
+
+    def add_listener(self, update_callback, keys):
+        """Call update_callback when any of keys changes; return a remover."""
+        token = object()
+        self._listeners[token] = (update_callback, keys)
+        return lambda: self._listeners.pop(token, None)
+
+    def _notify(self, changed):
+        """Call the listeners of the changed keys."""
+        if not changed:
+            return
+        for update_callback, keys in list(self._listeners.values()):
+            if not changed.isdisjoint(keys):
+                update_callback()
+
+    def track(self, coordinator):
+        """Follow the snapshots of a coordinator until untrack or close.
+
+        以 OpenID 区分账户，多个条目共享同一协调器时只计算一次；重复调用不会重复跟踪。
+        """
+        account = coordinator.openid
+        if account in self._tracked:
+            return
+
+        def _update():
+            if coordinator.data is not None:
+                self.update(account, coordinator.data)
+
+        _update()
+        unsub = coordinator.async_add_listener(_update, HOUSEHOLD_KEYS)
+
+        def _stop():
+            unsub()
+            self.remove(account)
+
+        self._tracked[account] = (coordinator, _stop)
+
+    def untrack(self, coordinator):
+        """Stop following a coordinator and drop its account."""
+        tracked = self._tracked.get(coordinator.openid)
+        if tracked is not None and tracked[0] is coordinator:
+            del self._tracked[coordinator.openid]
+            tracked[1]()
+
+    def close(self):
+        """Stop following every coordinator."""
+        while self._tracked:
+            _, (_, stop) = self._tracked.popitem()
+            stop()
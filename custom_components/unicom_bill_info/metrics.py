@@ -0,0 +1,196 @@
+"""Prometheus metrics for every polled account.
+
+每个账户的指标行预先生成并缓存：指标用到的快照字段变化时重新生成数值指标，
+每次刷新后重新生成运行统计；拼接好的文本也会缓存，没有账户变化时抓取直接返回。
+"""
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import callback
+
+from .export import account_key
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 用量指标：资源, 单位
+RESOURCES = (("voice", "minutes"), ("sms", "messages"), ("data", "megabytes"))
+
+# 数值指标读取的快照字段，只有这些字段变化时才重新生成
+SNAPSHOT_KEYS = frozenset(
+    ["balance", "real_fee"]
+    + [f"{resource}_{field}" for resource, _ in RESOURCES for field in ("used", "available", "ratio")]
+)
+
+# 指标名 -> (类型, 说明)
+FAMILIES = {
+    "unicom_balance_cny": ("gauge", "Available balance in CNY."),
+    "unicom_real_fee_cny": ("gauge", "Real-time fee of the current cycle in CNY."),
+    "unicom_used": ("gauge", "Usage of the current cycle."),
+    "unicom_available": ("gauge", "Remaining allowance of the current cycle."),
+    "unicom_usage_ratio_percent": ("gauge", "Share of the allowance used."),
+    "unicom_up": ("gauge", "Whether the last refresh succeeded."),
+    "unicom_last_success_timestamp_seconds": ("gauge", "Time of the last successful refresh."),
+    "unicom_refresh_duration_seconds": ("histogram", "Duration of refreshes."),
+    "unicom_refresh_errors_total": ("counter", "Failed refreshes by error class."),
+    "unicom_suppressed_updates_total": ("counter", "Entity updates skipped because nothing they show changed."),
+}
+
+
+def escape(value):
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def sample(family, labels, value, extra=""):
+    """Return one exposition line."""
+    return f"{family}{{{labels}{extra}}} {float(value)!r}\n"
+
+
+class AccountMetrics:
+    """Cached metric lines of one account."""
+
+    def __init__(self, coordinator, name):
+        """Initialize for a coordinator and a display name."""
+        self.coordinator = coordinator
+        self.labels = f'account="{account_key(coordinator.openid)}",name="{escape(name)}"'
+        self._snapshot_lines = None
+        self._ops_lines = None
+        self._ops_refresh = None
+
+    @callback
+    def invalidate(self):
+        """Drop the cached snapshot metrics after the snapshot changed."""
+        self._snapshot_lines = None
+
+    @property
+    def stale(self):
+        """Return True if lines() would regenerate anything."""
+        return self._snapshot_lines is None or self._ops_refresh != self.coordinator.refresh_count
+
+    def lines(self):
+        """Return {family: [lines]} for this account, regenerating stale parts."""
+        if self._snapshot_lines is None:
+            self._snapshot_lines = self._render_snapshot()
+        if self._ops_refresh != self.coordinator.refresh_count:
+            self._ops_lines = self._render_ops()
+            self._ops_refresh = self.coordinator.refresh_count
+        return self._snapshot_lines, self._ops_lines
+
+    def _render_snapshot(self):
+        """Render the gauges read from the snapshot."""
+        data = self.coordinator.data or {}
+        lines = {}
+
+        def _add(family, value, extra=""):
+            if value is not None:
+                lines.setdefault(family, []).append(sample(family, self.labels, value, extra))
+
+        _add("unicom_balance_cny", data.get("balance"))
+        _add("unicom_real_fee_cny", data.get("real_fee"))
+        for resource, unit in RESOURCES:
+            extra = f',resource="{resource}",unit="{unit}"'
+            _add("unicom_used", data.get(f"{resource}_used"), extra)
+            _add("unicom_available", data.get(f"{resource}_available"), extra)
+            _add("unicom_usage_ratio_percent", data.get(f"{resource}_ratio"), f',resource="{resource}"')
+        return lines
+
+    def _render_ops(self):
+        """Render the refresh statistics."""
+        coordinator = self.coordinator
+        labels = self.labels
+        lines = {
+            "unicom_up": [sample("unicom_up", labels, coordinator.last_update_success)],
+            "unicom_suppressed_updates_total": [
+                sample("unicom_suppressed_updates_total", labels, coordinator.suppressed_updates)
+            ],
+        }
+        if coordinator.last_update_success_time is not None:
+            lines["unicom_last_success_timestamp_seconds"] = [sample(
+                "unicom_last_success_timestamp_seconds",
+                labels,
+                coordinator.last_update_success_time.timestamp(),
+            )]
+
+        histogram = coordinator.refresh_latency
+        family = "unicom_refresh_duration_seconds"
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            buckets.append(sample(f"{family}_bucket", labels, cumulative, f',le="{bound}"'))
+        buckets.append(sample(f"{family}_bucket", labels, histogram.count, ',le="+Inf"'))
+        buckets.append(sample(f"{family}_sum", labels, histogram.sum))
+        buckets.append(sample(f"{family}_count", labels, histogram.count))
+        lines[family] = buckets
+
+        lines["unicom_refresh_errors_total"] = [
+            sample("unicom_refresh_errors_total", labels, count, f',class="{escape(error)}"')
+            for error, count in sorted(coordinator.error_counts.items())
+        ]
+        return lines
+
+
+class MetricsRenderer:
+    """Render the metrics of all tracked accounts."""
+
+    def __init__(self):
+        """Initialize with no accounts."""
+        self._accounts = {}
+        self._body = None
+        self._dirty = True
+
+    def track(self, coordinator, name):
+        """Include a coordinator in the metrics; return a function that stops it."""
+        account = AccountMetrics(coordinator, name)
+        self._accounts[coordinator.openid] = account
+        self._dirty = True
+        unsub = coordinator.async_add_listener(account.invalidate, SNAPSHOT_KEYS)
+
+        def _stop():
+            unsub()
+            self._accounts.pop(coordinator.openid, None)
+            self._dirty = True
+
+        return _stop
+
+    def render(self):
+        """Return the exposition text, reusing the last one if no account changed."""
+        if self._dirty or any(account.stale for account in self._accounts.values()):
+            self._body = self._render()
+            self._dirty = False
+        return self._body
+
+    def _render(self):
+        """Join the cached lines of every account."""
+        per_account = [account.lines() for account in self._accounts.values()]
+        parts = []
+        for family, (kind, description) in FAMILIES.items():
+            samples = [
+                line
+                for account_lines in per_account
+                for lines in account_lines
+                for line in lines.get(family, ())
+            ]
+            if samples:
+                parts.append(f"# HELP {family} {description}\n# TYPE {family} {kind}\n")
+                parts.extend(samples)
+        return "".join(parts)
+
+
+class MetricsView(HomeAssistantView):
+    """Serve the metrics to an authenticated Prometheus scraper."""
+
+    url = "/api/unicom_bill_info/metrics"
+    name = "api:unicom_bill_info:metrics"
+    requires_auth = True
+
+    def __init__(self, renderer):
+        """Initialize with the renderer."""
+        self.renderer = renderer
+
+    async def get(self, request):
+        """Return the metrics in the Prometheus text format."""
+        return web.Response(
+            body=self.renderer.render().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
@@ -0,0 +1,192 @@
+"""Integration-wide rate limiting for requests to the 10010 API."""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# 优先级数值越小越先处理
+PRIORITY_INTERACTIVE = 0  # 用户手动刷新、配置流程校验
+PRIORITY_SCHEDULED = 1  # 定时轮询
+PRIORITY_BACKFILL = 2  # 历史数据回填
+
+
+class RequestShed(Exception):
+    """Raised when a queued request would miss its deadline."""
+
+
+class TokenBucketLimiter:
+    """Token bucket shared by every request the integration sends.
+
+    Requests that cannot get a token immediately wait in a priority queue.
+    A waiting request is shed with RequestShed as soon as it can no longer
+    be served before its deadline. Listeners are called whenever the queue
+    or the statistics change.
+    """
+
+    def __init__(self, rate, burst):
+        """Initialize with a rate in tokens per second and a bucket size."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queue = []  # (priority, seq, deadline, enqueued, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self.last_wait = 0.0
+        self.peak_depth = 0
+        self.shed_count = 0
+        self._listeners = []
+
+    @property
+    def queue_depth(self):
+        """Return the number of requests waiting for a token."""
+        return sum(1 for item in self._queue if not item[4].done())
+
+    def add_listener(self, update_callback):
+        """Call update_callback when the queue or statistics change; return a remover."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    def _notify(self):
+        """Call every listener."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    async def acquire(self, priority=PRIORITY_SCHEDULED, deadline=None):
+        """Wait for a token.
+
+        deadline 为从现在起的秒数，无法在此之前获得令牌的请求会被丢弃。
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if not self._queue and self._tokens >= 1 and now >= self._paused_until:
+            self._tokens -= 1
+            if self.last_wait:
+                self.last_wait = 0.0
+                self._notify()
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        abs_deadline = now + deadline if deadline is not None else None
+        heapq.heappush(
+            self._queue, (priority, next(self._seq), abs_deadline, now, future)
+        )
+        self.peak_depth = max(self.peak_depth, len(self._queue))
+        self._dispatch(changed=True)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # 被取消的请求留在队列中，由 _dispatch 跳过；队列深度已经变化
+            self._notify()
+            raise
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while, e.g. after upstream throttling."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._dispatch()
+
+    def _refill(self, now):
+        """Add the tokens accumulated since the last refill."""
+        elapsed = now - self._updated
+        self._updated = now
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    def _next_token_delay(self, now):
+        """Return seconds until the next token becomes available."""
+        delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+        return max(delay, self._paused_until - now)
+
+    def _dispatch(self, changed=False):
+        """Hand out available tokens and shed requests that will be late."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        self._refill(now)
+        while self._queue:
+            _, _, _, enqueued, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if now < self._paused_until or self._tokens < 1:
+                break
+            heapq.heappop(self._queue)
+            self._tokens -= 1
+            self.last_wait = now - enqueued
+            future.set_result(self.last_wait)
+            changed = True
+
+        if self._shed_late(now):
+            changed = True
+        if changed:
+            self._notify()
+
+        if self._queue:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self._next_token_delay(now), self._dispatch)
+
+    def _shed_late(self, now):
+        """Fail queued requests whose estimated start is past their deadline.
+
+        Returns True if any request was shed.
+        """
+        pending = sorted(item for item in self._queue if not item[4].done())
+        first = self._next_token_delay(now)
+        kept = []
+        for item in pending:
+            deadline, future = item[2], item[4]
+            eta = now + first + len(kept) / self.rate
+            if deadline is not None and eta > deadline:
+                self.shed_count += 1
+                future.set_exception(
+                    RequestShed(f"Request would wait {eta - now:.1f}s, past its deadline")
+                )
+                continue
+            kept.append(item)
+        if len(kept) != len(self._queue):
+            _LOGGER.debug("Shed %d queued requests", len(pending) - len(kept))
+            heapq.heapify(kept)
+            self._queue = kept
+        return len(kept) != len(pending)
+
+
+class AdmissionQueue:
+    """Spread out work that would otherwise all start at the same moment.
+
+    用于 Home Assistant 启动后各账户的首次刷新：同时进行的数量有上限，
+    相邻两次开始之间至少间隔 spacing 秒。
+    """
+
+    def __init__(self, concurrency, spacing):
+        """Initialize with a concurrency limit and a minimum start spacing."""
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._spacing = spacing
+        self._next_start = 0.0
+        self.waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Wait for a turn and hold it for the duration of the block."""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._spacing
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,249 @@
+"""Record real 10010 API responses and replay them as fixtures.
+
+RecordingTransport 包装真实的传输层，把每个原始响应（已脱敏）保存为一个 JSON 文件；
+ReplayTransport 按录制顺序循环返回这些响应，不做任何等待，可用于回归检查和解析性能测试。
+ReplayServer 通过本地 HTTP 服务器提供这些响应，并可按比例注入上游故障，用于检查刷新在故障下仍能按时结束。
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+from aiohttp import web
+
+REDACTED = "**REDACTED**"
+
+
+def endpoint_name(url):
+    """Return the last path segment of an API URL, e.g. 'sspbigball'."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def redact(text, openid):
+    """Remove the OpenID from a response body."""
+    if openid:
+        text = text.replace(openid, REDACTED)
+    return text
+
+
+class RecordingTransport:
+    """Save every response passing through another transport."""
+
+    def __init__(self, transport, directory):
+        """Initialize with the wrapped transport and the fixture directory."""
+        self.transport = transport
+        self.directory = directory
+        self._seq = itertools.count()
+
+    async def post(self, url, payload):
+        """Forward the request and record its response."""
+        status, text, retry_after = await self.transport.post(url, payload)
+        record = {
+            "endpoint": endpoint_name(url),
+            "status": status,
+            "retry_after": retry_after,
+            "body": redact(text, payload.get("openid")),
+        }
+        filename = f"{time.time_ns()}-{next(self._seq):04d}-{record['endpoint']}.json"
+        # 文件写入放到线程池，避免阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write, os.path.join(self.directory, filename), record
+        )
+        return status, text, retry_after
+
+    def _write(self, path, record):
+        """Write one fixture file."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(record, file, ensure_ascii=False, indent=2)
+
+
+def load_fixtures(directory):
+    """Return the recorded responses in a directory grouped by endpoint."""
+    fixtures = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as file:
+            record = json.load(file)
+        fixtures.setdefault(record["endpoint"], []).append(record)
+    return fixtures
+
+
+class ReplayTransport:
+    """Serve recorded responses in order, cycling per endpoint."""
+
+    def __init__(self, fixtures):
+        """Initialize with fixtures as returned by load_fixtures."""
+        self._cycles = {
+            endpoint: itertools.cycle(records) for endpoint, records in fixtures.items()
+        }
+        self.requests = 0
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Create a replay transport from a fixture directory."""
+        return cls(load_fixtures(directory))
+
+    async def post(self, url, payload):
+        """Return the next recorded response for the endpoint."""
+        endpoint = endpoint_name(url)
+        if endpoint not in self._cycles:
+            raise LookupError(f"No recorded responses for {endpoint}")
+        record = next(self._cycles[endpoint])
+        self.requests += 1
+        return record["status"], record["body"], record.get("retry_after")
+
+
+# 可注入的故障：HTML 错误页、截断的响应体、慢速滴漏、无响应、空 data 数组、上游 5xx、连接中断
+FAULTS = ("html", "truncated", "slow_drip", "hang", "empty_data", "http_502", "disconnect")
+
+API_PATH = "/wxapplet/weixinNew"
+
+
+class ReplayServer:
+    """Local HTTP stand-in for the 10010 API.
+
+    通过真实的 HTTP 连接返回另一个传输层（通常是 ReplayTransport）的响应，并按比例注入故障，
+    请求经过完整的 aiohttp 客户端，可以检查超时、连接归还和任务清理。
+    服务器在单独的线程和事件循环中运行，它的任务不会与客户端的任务混在一起。
+    """
+
+    def __init__(self, transport, rate=0.0, faults=FAULTS, drip_interval=0.05, seed=None):
+        """Initialize with the transport providing healthy responses and the share of faults."""
+        self.transport = transport
+        self.rate = rate
+        self.faults = tuple(faults)
+        self.drip_interval = drip_interval
+        self._random = random.Random(seed)
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self._closing = False
+        self.base_url = None
+        self.injected = {}
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the base URL to give the client."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="ReplayServer", daemon=True
+        )
+        self._thread.start()
+        self.base_url = await self._call(self._async_start(host, port))
+        return self.base_url
+
+    async def close(self):
+        """Stop the server, close its connections and its thread."""
+        if self._loop is None:
+            return
+        self._closing = True
+        await self._call(self._async_stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._loop.close()
+        self._loop = None
+
+    async def _async_stop(self):
+        """Stop the application and end the handlers still holding a request."""
+        await self._runner.cleanup()
+        # 无响应、慢速滴漏等故障的处理可能还在等待，随服务器一起结束，避免事件循环关闭时被销毁
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def open_connections(self):
+        """Return the number of client connections the server still holds."""
+        return len(self._runner.server.connections) if self._runner else 0
+
+    def _call(self, coro):
+        """Run a coroutine in the server thread and await its result."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _async_start(self, host, port):
+        """Start the aiohttp application in the server thread."""
+        app = web.Application()
+        app.router.add_post(API_PATH + "/{endpoint}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    async def _handle(self, request):
+        """Answer one request, possibly with a fault."""
+        url = f"{self.base_url}/{request.match_info['endpoint']}"
+        payload = await request.json()
+        if self._random.random() >= self.rate:
+            return self._response(*await self.transport.post(url, payload))
+        fault = self._random.choice(self.faults)
+        self.injected[fault] = self.injected.get(fault, 0) + 1
+        return await getattr(self, f"_fault_{fault}")(request, url, payload)
+
+    @staticmethod
+    def _response(status, text, retry_after):
+        """Return a plain response with an optional Retry-After header."""
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        return web.Response(
+            status=status, text=text, content_type="application/json", headers=headers
+        )
+
+    async def _wait_for_disconnect(self, request):
+        """Hold the request until the client gives up on it or the server closes."""
+        transport = request.transport
+        while not self._closing and transport is not None and not transport.is_closing():
+            await asyncio.sleep(self.drip_interval)
+
+    async def _fault_html(self, request, url, payload):
+        return web.Response(
+            text="<html><body><h1>系统繁忙</h1></body></html>", content_type="text/html"
+        )
+
+    async def _fault_truncated(self, request, url, payload):
+        # 声明完整长度，只发送一半后断开
+        _, text, _ = await self.transport.post(url, payload)
+        body = text.encode("utf-8")
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        await response.write(body[: len(body) // 2])
+        request.transport.close()
+        return response
+
+    async def _fault_slow_drip(self, request, url, payload):
+        # 每隔 drip_interval 发送一个字节，整体远超请求超时
+        _, text, _ = await self.transport.post(url, payload)
+        body = text.encode("utf-8")
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        try:
+            for index in range(len(body)):
+                if self._closing:
+                    break
+                await response.write(body[index:index + 1])
+                await asyncio.sleep(self.drip_interval)
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def _fault_hang(self, request, url, payload):
+        await self._wait_for_disconnect(request)
+        return web.Response(status=504)
+
+    async def _fault_empty_data(self, request, url, payload):
+        return web.json_response({"code": "0000", "data": []})
+
+    async def _fault_http_502(self, request, url, payload):
+        return web.Response(
+            status=502, text="<html><body>502 Bad Gateway</body></html>", content_type="text/html"
+        )
+
+    async def _fault_disconnect(self, request, url, payload):
+        request.transport.close()
+        return web.Response()
@@ -0,0 +1,69 @@
+"""Services provided by the China Unicom bill info integration."""
+from datetime import timedelta
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+
+from .const import CONF_HOUSEHOLD, DOMAIN
+
+SERVICE_BURST = "burst"
+SERVICE_GET_HISTORY = "get_history"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_INTERVAL = "interval"
+ATTR_DURATION = "duration"
+ATTR_MONTHS = "months"
+
+BURST_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): str,
+    # 轮询间隔（秒）
+    vol.Optional(ATTR_INTERVAL, default=15): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+    # 持续时间（分钟），结束后自动恢复正常轮询
+    vol.Optional(ATTR_DURATION, default=10): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+})
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): str,
+    # 返回最近的月份数，不填返回全部
+    vol.Optional(ATTR_MONTHS): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+})
+
+
+def get_coordinator(hass, entry_id):
+    """Return the coordinator of a loaded account config entry."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN or entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Config entry {entry_id} is not loaded")
+    if entry.data.get(CONF_HOUSEHOLD):
+        raise ServiceValidationError(f"Config entry {entry_id} is not an account")
+    return entry.runtime_data
+
+
+async def async_register_services(hass):
+    """Register the integration services."""
+
+    async def _async_burst(call):
+        coordinator = get_coordinator(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        await coordinator.async_start_burst(
+            timedelta(seconds=call.data[ATTR_INTERVAL]),
+            timedelta(minutes=call.data[ATTR_DURATION]),
+        )
+
+    async def _async_get_history(call):
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        get_coordinator(hass, entry_id)
+        # 只读取本地保存的历史，不访问联通接口
+        history = hass.data[DOMAIN]["history"][entry_id]
+        return {"months": history.query(call.data.get(ATTR_MONTHS))}
+
+    hass.services.async_register(DOMAIN, SERVICE_BURST, _async_burst, schema=BURST_SCHEMA)
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        _async_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,137 @@
+"""Websocket commands returning parsed account snapshots.
+
+仪表盘和配套工具可以一次读取所有账户的数值快照，不需要逐个读取实体状态再解析字符串。
+"""
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import CONF_HOUSEHOLD, DOMAIN, SIGNAL_ENTRY_LOADED, SIGNAL_ENTRY_UNLOADED
+from .coordinator import get_entry_config
+
+
+@callback
+def async_register_websocket_commands(hass):
+    """Register the websocket commands of the integration."""
+    websocket_api.async_register_command(hass, ws_snapshots)
+    websocket_api.async_register_command(hass, ws_subscribe_snapshots)
+
+
+def _loaded_coordinators(hass):
+    """Return {entry_id: (entry, coordinator)} for every loaded account."""
+    return {
+        entry.entry_id: (entry, entry.runtime_data)
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED and not entry.data.get(CONF_HOUSEHOLD)
+    }
+
+
+def _account(entry, coordinator):
+    """Return the websocket representation of one account."""
+    fetched = coordinator.last_update_success_time
+    return {
+        # 与传感器一致，选项中修改的名称优先
+        "name": get_entry_config(entry)["name"],
+        "available": coordinator.entities_available,
+        "stale": coordinator.is_stale,
+        "last_update_success_time": fetched.isoformat() if fetched else None,
+        "data": coordinator.data,
+    }
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/snapshots"})
+@callback
+def ws_snapshots(hass, connection, msg):
+    """Return the cached snapshots of all accounts."""
+    connection.send_result(msg["id"], {
+        "accounts": {
+            entry_id: _account(entry, coordinator)
+            for entry_id, (entry, coordinator) in _loaded_coordinators(hass).items()
+        }
+    })
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/snapshots/subscribe"})
+@callback
+def ws_subscribe_snapshots(hass, connection, msg):
+    """Send all snapshots once, then only the fields that change.
+
+    首条事件包含全部账户；之后每次刷新只发送变化的字段及可用状态，没有变化时不发送。
+    之后加载或重新加载的账户会自动接入，首次出现的账户发送完整快照。
+    """
+    from .coordinator import changed_keys
+
+    accounts = _loaded_coordinators(hass)
+    # entry_id -> 最近一次发送的 (快照, 可用, 过期)
+    sent = {
+        entry_id: (coordinator.data, coordinator.entities_available, coordinator.is_stale)
+        for entry_id, (_, coordinator) in accounts.items()
+    }
+    listeners = {}
+
+    @callback
+    def _async_send(entry_id, current, available, stale):
+        previous, was_available, was_stale = sent.get(entry_id, (None, None, None))
+        if previous is None or current is None:
+            changed = current if current != previous else {}
+        else:
+            changed = {key: current.get(key) for key in changed_keys(previous, current)}
+        sent[entry_id] = (current, available, stale)
+        if not changed and (available, stale) == (was_available, was_stale):
+            return
+        connection.send_event(msg["id"], {
+            "entry_id": entry_id,
+            "available": available,
+            "stale": stale,
+            "changed": changed,
+        })
+
+    @callback
+    def _async_attach(entry_id, coordinator):
+        @callback
+        def _async_send_changes():
+            _async_send(
+                entry_id, coordinator.data, coordinator.entities_available, coordinator.is_stale
+            )
+
+        listeners[entry_id] = coordinator.async_add_listener(_async_send_changes)
+        return _async_send_changes
+
+    @callback
+    def _async_entry_loaded(entry):
+        if unsub := listeners.pop(entry.entry_id, None):
+            unsub()
+        # 重新加载后与之前发送的快照比较，只发送差异
+        _async_attach(entry.entry_id, entry.runtime_data)()
+
+    @callback
+    def _async_entry_unloaded(entry):
+        if unsub := listeners.pop(entry.entry_id, None):
+            unsub()
+            previous, _, stale = sent[entry.entry_id]
+            _async_send(entry.entry_id, previous, False, stale)
+
+    for entry_id, (_, coordinator) in accounts.items():
+        _async_attach(entry_id, coordinator)
+    unsubs = [
+        async_dispatcher_connect(hass, SIGNAL_ENTRY_LOADED, _async_entry_loaded),
+        async_dispatcher_connect(hass, SIGNAL_ENTRY_UNLOADED, _async_entry_unloaded),
+    ]
+
+    @callback
+    def _async_unsubscribe():
+        for unsub in [*unsubs, *listeners.values()]:
+            unsub()
+        listeners.clear()
+
+    connection.subscriptions[msg["id"]] = _async_unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_event(msg["id"], {
+        "accounts": {
+            entry_id: _account(entry, coordinator)
+            for entry_id, (entry, coordinator) in accounts.items()
+        }
+    })
@@ -0,0 +1 @@
+"""Tests for the China Unicom bill info integration."""
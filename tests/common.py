@@ -0,0 +1,31 @@
+"""Helpers for the tests that run Home Assistant.
+
+只在已经 importorskip pytest_homeassistant_custom_component 的测试模块中导入。
+"""
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.unicom_bill_info.const import DOMAIN
+
+
+async def async_setup_integration(hass, replay_server, **conf):
+    """Set up the integration against the local stand-in for the 10010 API."""
+    conf = {"base_urls": [replay_server.base_url], "startup": {"spacing": 0}, **conf}
+    assert await async_setup_component(hass, DOMAIN, {DOMAIN: conf})
+    # 默认限流会让大量请求排很久的队，测试中放开；保留同一个限流器，诊断实体仍跟随它
+    limiter = hass.data[DOMAIN]["limiter"]
+    limiter.rate = limiter.burst = 10000
+    await hass.async_block_till_done()
+
+
+async def async_add_account(hass, openid, entry_id=None, **data):
+    """Add and set up one account entry."""
+    data = {"name": f"联通数据 {openid[-4:]}", "openid": openid, "refresh_interval": 15, **data}
+    entry = MockConfigEntry(
+        domain=DOMAIN, version=2, unique_id=openid, title=data["name"], data=data,
+        entry_id=entry_id,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
@@ -0,0 +1,40 @@
+"""Fixtures shared by the tests.
+
+不依赖 Home Assistant 的测试是普通的同步函数，用 asyncio.run 运行协程；
+需要 Home Assistant 的测试模块先 importorskip pytest_homeassistant_custom_component。
+"""
+import os
+
+import pytest
+
+from custom_components.unicom_bill_info.replay import ReplayServer, ReplayTransport
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "replay")
+
+
+def replay_transport(scenario=None):
+    """Return a transport serving the recorded responses in tests/fixtures/replay.
+
+    scenario 为子目录名时只回放该子目录中的录制数据（如不限量套餐、多项流量额度）。
+    """
+    return ReplayTransport.from_directory(os.path.join(FIXTURES, scenario) if scenario else FIXTURES)
+
+
+@pytest.fixture(autouse=True)
+def loopback_sockets(request):
+    """Allow connections to the local stand-in when pytest-socket blocks sockets."""
+    # pytest_homeassistant_custom_component 默认禁用 socket，只放行 127.0.0.1
+    if request.config.pluginmanager.hasplugin("socket"):
+        request.getfixturevalue("socket_enabled")
+
+
+@pytest.fixture
+async def replay_server(request):
+    """Serve the recorded responses from a local stand-in for the 10010 API.
+
+    间接参数化时参数为回放的子目录名。
+    """
+    server = ReplayServer(replay_transport(getattr(request, "param", None)))
+    await server.start()
+    yield server
+    await server.close()
@@ -0,0 +1,224 @@
+"""Response classification and host failover of the 10010 API client."""
+import asyncio
+import json
+
+import pytest
+
+from custom_components.unicom_bill_info.api import (
+    EndpointPool,
+    UnicomAuthError,
+    UnicomClient,
+    UnicomConnectionError,
+    UnicomMalformedResponse,
+    UnicomRateLimitError,
+    UnicomServerError,
+    UnicomTimeoutError,
+    UnicomUpstreamError,
+    check_response,
+    parse_usage,
+)
+
+PRIMARY = "http://primary.test/wxapplet/weixinNew"
+BACKUP = "http://backup.test/wxapplet/weixinNew"
+
+
+def _body(code, desc=""):
+    return json.dumps({"code": code, "desc": desc, "data": []})
+
+
+@pytest.mark.parametrize(
+    ("status", "text", "error"),
+    [
+        (429, "", UnicomRateLimitError),
+        (401, "", UnicomAuthError),
+        (403, "", UnicomAuthError),
+        (502, "<html>Bad Gateway</html>", UnicomServerError),
+        (200, "<html>维护中</html>", UnicomMalformedResponse),
+        (200, json.dumps({"data": []}), UnicomMalformedResponse),
+        (200, _body("1001", "操作过于频繁，请稍后再试"), UnicomRateLimitError),
+        (200, _body("1002", "openid已失效"), UnicomAuthError),
+        (200, _body("2001", "系统繁忙"), UnicomUpstreamError),
+    ],
+)
+def test_check_response_classifies_errors(status, text, error):
+    """Each failure maps to the exception the coordinator reacts to."""
+    with pytest.raises(error):
+        check_response(status, text)
+
+
+def test_business_errors_are_not_server_errors():
+    """An unknown business code is an upstream error but not a 5xx."""
+    with pytest.raises(UnicomUpstreamError) as info:
+        check_response(200, _body("2001", "系统繁忙"))
+    assert not isinstance(info.value, UnicomServerError)
+
+
+def test_check_response_returns_the_body_and_retry_after():
+    """A success returns the decoded body; throttling keeps Retry-After."""
+    assert check_response(200, _body("0000"))["code"] == "0000"
+    with pytest.raises(UnicomRateLimitError) as info:
+        check_response(429, "", "30")
+    assert info.value.retry_after == 30
+
+
+def _data_item(used, total, available, ratio):
+    return {
+        "SOURCE_TYPE": "3",
+        "SPECIAL_TYPE": "0",
+        "X_USED_VALUE": used,
+        "ADDUP_UPPER": total,
+        "X_EXCEED_VALUE": "0.00MB",
+        "X_CANUSE_VALUE": available,
+        "USED_RATIO": ratio,
+    }
+
+
+def test_parse_usage_converts_units():
+    """Data sizes become megabytes and the ratio is rounded."""
+    snapshot = parse_usage([_data_item("4.52GB", "30.00GB", "25.48GB", "15.067")])
+
+    assert snapshot["data_used"] == pytest.approx(4.52 * 1024)
+    assert snapshot["data_total"] == pytest.approx(30 * 1024)
+    assert snapshot["data_available"] == pytest.approx(25.48 * 1024)
+    assert snapshot["data_ratio"] == 15.07
+    assert snapshot["voice_total"] is None
+
+
+@pytest.mark.parametrize("total", ["0.00MB", "0", "无限", None])
+def test_unlimited_allowance_has_no_total_or_headroom(total):
+    """A -1 ratio with a zero or unparsable total is an unlimited plan, not an empty one."""
+    snapshot = parse_usage([_data_item("12.30GB", total, "0.00MB", "-1")])
+
+    assert snapshot["data_used"] == pytest.approx(12.3 * 1024)
+    assert snapshot["data_total"] is None
+    assert snapshot["data_available"] is None
+    assert snapshot["data_ratio"] is None
+
+
+def test_several_data_items_are_summed():
+    """Every data item counts and the ratio is recomputed from the sums."""
+    snapshot = parse_usage([
+        _data_item("4.00GB", "30.00GB", "26.00GB", "13.33"),
+        _data_item("1.00GB", "10.00GB", "9.00GB", "10"),
+    ])
+
+    assert snapshot["data_used"] == 5 * 1024
+    assert snapshot["data_total"] == 40 * 1024
+    assert snapshot["data_available"] == 35 * 1024
+    assert snapshot["data_ratio"] == 12.5
+
+
+def test_one_unlimited_data_item_makes_the_sum_unlimited():
+    """An unlimited item among limited ones leaves no meaningful total."""
+    snapshot = parse_usage([
+        _data_item("4.00GB", "30.00GB", "26.00GB", "13.33"),
+        _data_item("12.30GB", "0.00MB", "0.00MB", "-1"),
+    ])
+
+    assert snapshot["data_used"] == pytest.approx(16.3 * 1024)
+    assert snapshot["data_total"] is None
+    assert snapshot["data_available"] is None
+    assert snapshot["data_ratio"] is None
+
+
+def test_untracked_ratio_keeps_a_real_total():
+    """A -1 ratio alone does not hide a real allowance."""
+    snapshot = parse_usage([_data_item("1.00GB", "10.00GB", "9.00GB", "-1")])
+
+    assert snapshot["data_total"] == 10 * 1024
+    assert snapshot["data_available"] == 9 * 1024
+    assert snapshot["data_ratio"] is None
+
+
+def test_endpoint_pool_prefers_fast_healthy_hosts(monkeypatch):
+    """Hosts are ordered by latency, and a failed host waits out its cooldown last."""
+    now = [1000.0]
+    monkeypatch.setattr("custom_components.unicom_bill_info.api.time.monotonic", lambda: now[0])
+    pool = EndpointPool([PRIMARY, BACKUP], cooldown=60)
+    assert pool.candidates() == [PRIMARY, BACKUP]
+
+    pool.record_success(PRIMARY, 0.8)
+    pool.record_success(BACKUP, 0.1)
+    assert pool.candidates() == [BACKUP, PRIMARY]
+
+    pool.record_failure(BACKUP)
+    assert pool.candidates() == [PRIMARY, BACKUP]
+    assert [host["healthy"] for host in pool.status()] == [True, False]
+
+    now[0] += 61
+    assert pool.candidates() == [BACKUP, PRIMARY]
+
+
+class _HostTransport:
+    """Answer per host: a (status, text) pair, an exception or a hang."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    async def post(self, url, payload):
+        base = url.rsplit("/", 1)[0]
+        self.calls.append(base)
+        answer = self.answers[base]
+        if answer == "hang":
+            await asyncio.sleep(3600)
+        if isinstance(answer, Exception):
+            raise answer
+        return (*answer, None)
+
+
+def _post(answers):
+    """Post once through both hosts; return the outcome, the hosts tried and the pool."""
+    transport = _HostTransport(answers)
+    pool = EndpointPool([PRIMARY, BACKUP])
+    client = UnicomClient(transport, timeout=0.05, endpoints=pool)
+
+    async def _run():
+        try:
+            return await client.async_post("sspbigball", {})
+        except Exception as err:  # pylint: disable=broad-except
+            return err
+
+    return asyncio.run(_run()), transport.calls, pool
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [(502, "Bad Gateway"), UnicomConnectionError("refused"), "hang"],
+)
+def test_transport_and_server_failures_fail_over(failure):
+    """Connection errors, timeouts and 5xx move on to the next host."""
+    outcome, calls, pool = _post({PRIMARY: failure, BACKUP: (200, _body("0000"))})
+
+    assert outcome["code"] == "0000"
+    assert calls == [PRIMARY, BACKUP]
+    assert [host["healthy"] for host in pool.status()] == [False, True]
+
+
+def test_timeouts_on_every_host_raise_a_timeout():
+    """The last host's error is raised once every host failed."""
+    outcome, calls, pool = _post({PRIMARY: "hang", BACKUP: "hang"})
+
+    assert isinstance(outcome, UnicomTimeoutError)
+    assert calls == [PRIMARY, BACKUP]
+    assert not any(host["healthy"] for host in pool.status())
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        (200, _body("2001", "系统繁忙")),
+        (200, _body("1002", "openid已失效")),
+        (200, "<html>维护中</html>"),
+        (429, ""),
+    ],
+)
+def test_business_errors_do_not_fail_over(answer):
+    """A host that answered stays healthy and the error is raised right away."""
+    outcome, calls, pool = _post({PRIMARY: answer, BACKUP: (200, _body("0000"))})
+
+    assert isinstance(outcome, Exception)
+    assert not isinstance(outcome, UnicomServerError)
+    assert calls == [PRIMARY]
+    assert all(host["healthy"] for host in pool.status())
+    assert pool.failures == {}
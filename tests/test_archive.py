@@ -0,0 +1,123 @@
+"""Daily compressed archive of raw responses."""
+import asyncio
+import gzip
+import os
+
+from custom_components.unicom_bill_info.archive import (
+    ArchivingTransport,
+    ResponseArchive,
+    archive_files,
+    iter_archive,
+)
+
+DAY = 24 * 3600
+MAY_1 = 1714521600  # 2024-05-01 00:00 UTC
+
+
+def _record(day, index=0, body="{}"):
+    return {"time": MAY_1 + day * DAY + index, "endpoint": "sspbigball", "status": 200, "body": body}
+
+
+def _write(archive, records):
+    async def _run():
+        for record in records:
+            archive.add(record)
+        await archive.async_flush()
+
+    asyncio.run(_run())
+
+
+def test_records_go_to_daily_files_and_read_back_in_order(tmp_path):
+    """Each UTC day has its own file; batches append and read back oldest first."""
+    archive = ResponseArchive(str(tmp_path))
+    _write(archive, [_record(0, 1), _record(1, 0)])
+    _write(archive, [_record(0, 2)])
+
+    assert archive_files(str(tmp_path)) == [
+        "responses-2024-05-01.jsonl.gz", "responses-2024-05-02.jsonl.gz",
+    ]
+    assert [record["time"] - MAY_1 for record in iter_archive(str(tmp_path))] == [1, 2, DAY]
+    assert [record["time"] for record in iter_archive(str(tmp_path), since="2024-05-02")] == [MAY_1 + DAY]
+    assert len(list(iter_archive(str(tmp_path), until="2024-05-01"))) == 2
+    assert archive.written == 3
+
+
+def test_oldest_days_are_deleted_to_stay_within_the_budget(tmp_path):
+    """Writing past max_bytes removes whole days starting with the oldest."""
+    body = os.urandom(3000).hex()
+    archive = ResponseArchive(str(tmp_path))
+    _write(archive, [_record(0, body=body)])
+    # 每天一个大小相同的文件，预算放得下两天半
+    day_size = os.path.getsize(tmp_path / archive_files(str(tmp_path))[0])
+    archive.max_bytes = day_size * 5 // 2
+    for day in range(1, 4):
+        _write(archive, [_record(day, body=body)])
+
+    files = archive_files(str(tmp_path))
+    assert files == ["responses-2024-05-03.jsonl.gz", "responses-2024-05-04.jsonl.gz"]
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= archive.max_bytes
+    assert archive.dropped == 0
+
+
+def test_a_batch_larger_than_the_budget_is_dropped(tmp_path):
+    """Records that cannot fit even in an empty archive are counted as dropped."""
+    archive = ResponseArchive(str(tmp_path), max_bytes=100)
+    _write(archive, [_record(0, body=os.urandom(500).hex())])
+
+    assert archive.dropped == 1
+    assert archive.written == 0
+    assert archive_files(str(tmp_path)) == []
+
+
+def test_full_batch_is_written_without_waiting_for_the_timer(tmp_path):
+    """Reaching batch_size starts a flush at once."""
+
+    async def _run():
+        archive = ResponseArchive(str(tmp_path), flush_interval=3600, batch_size=2)
+        archive.add(_record(0, 0))
+        archive.add(_record(0, 1))
+        await asyncio.gather(*archive._flushing)
+        return archive.written, archive._timer
+
+    written, timer = asyncio.run(_run())
+
+    assert written == 2
+    assert timer is None
+
+
+def test_damaged_file_is_read_up_to_the_damage(tmp_path):
+    """A truncated gzip member stops that file only; later days are still read."""
+    archive = ResponseArchive(str(tmp_path))
+    _write(archive, [_record(0, 0)])
+    _write(archive, [_record(0, 1, body=os.urandom(200).hex())])
+    _write(archive, [_record(1, 0)])
+    damaged = tmp_path / "responses-2024-05-01.jsonl.gz"
+    damaged.write_bytes(damaged.read_bytes()[:-40])
+
+    assert [record["time"] - MAY_1 for record in iter_archive(str(tmp_path))] == [0, DAY]
+
+
+def test_archiving_transport_redacts_the_openid(tmp_path):
+    """Archived bodies never contain the OpenID."""
+
+    class _Transport:
+        async def post(self, url, payload):
+            return 200, f'{{"openid":"{payload["openid"]}"}}', None
+
+    async def _run():
+        archive = ResponseArchive(str(tmp_path))
+        transport = ArchivingTransport(_Transport(), archive)
+        result = await transport.post(
+            "https://example.invalid/wxapplet/weixinNew/sspbigball", {"openid": "secret-openid"}
+        )
+        await archive.async_flush()
+        return result
+
+    status, text, _ = asyncio.run(_run())
+
+    assert "secret-openid" in text
+    (record,) = iter_archive(str(tmp_path))
+    assert record["endpoint"] == "sspbigball"
+    assert "secret-openid" not in record["body"]
+    with gzip.open(tmp_path / archive_files(str(tmp_path))[0], "rt", encoding="utf-8") as file:
+        assert "secret-openid" not in file.read()
@@ -0,0 +1,188 @@
+"""Refreshes stay bounded and leak nothing when the upstream misbehaves.
+
+客户端经由真实的 aiohttp 连接访问本地的 ReplayServer，由它注入各种上游故障。
+"""
+import asyncio
+
+import aiohttp
+import pytest
+
+from custom_components.unicom_bill_info.api import (
+    BALANCE_ENDPOINT,
+    AiohttpTransport,
+    EndpointPool,
+    UnicomApiError,
+    UnicomClient,
+)
+from custom_components.unicom_bill_info.cli import connection_counts
+from custom_components.unicom_bill_info.replay import FAULTS, ReplayServer
+
+from .conftest import replay_transport
+
+TIMEOUT = 0.3
+MARGIN = 0.2
+# 故障处理期间事件循环允许的最长停顿（秒）
+MAX_LOOP_LAG = 0.1
+HEARTBEAT = 0.01
+
+
+async def _fetch_through_faults(faults, fetches=12, concurrency=4):
+    """Fetch through a server injecting only the given faults; return the findings."""
+    server = ReplayServer(replay_transport(), rate=1.0, faults=faults, drip_interval=0.02, seed=1)
+    base_url = await server.start()
+    outcomes = []
+    durations = []
+    max_lag = 0.0
+
+    async def _heartbeat():
+        nonlocal max_lag
+        while True:
+            start = loop.time()
+            await asyncio.sleep(HEARTBEAT)
+            max_lag = max(max_lag, loop.time() - start - HEARTBEAT)
+
+    loop = asyncio.get_running_loop()
+    heartbeat = asyncio.ensure_future(_heartbeat())
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = UnicomClient(
+                AiohttpTransport(session), timeout=TIMEOUT, endpoints=EndpointPool([base_url])
+            )
+            before = asyncio.all_tasks()
+
+            async def _fetch(openid):
+                start = loop.time()
+                try:
+                    await client.async_fetch(openid)
+                    outcomes.append(None)
+                except Exception as err:  # pylint: disable=broad-except
+                    outcomes.append(err)
+                durations.append(loop.time() - start)
+
+            for _ in range(0, fetches, concurrency):
+                await asyncio.gather(*(_fetch(f"chaos-{index}") for index in range(concurrency)))
+
+            leaked = [task for task in asyncio.all_tasks() - before if not task.done()]
+            # 服务器在客户端断开后才结束对应的处理，等它跟上
+            for _ in range(100):
+                if connection_counts(session.connector)[1] == server.open_connections:
+                    break
+                await asyncio.sleep(0.01)
+            acquired, pooled = connection_counts(session.connector)
+            server_connections = server.open_connections
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        await server.close()
+    return {
+        "outcomes": outcomes,
+        "worst": max(durations),
+        "max_lag": max_lag,
+        "leaked": leaked,
+        "acquired": acquired,
+        "pooled": pooled,
+        "server_connections": server_connections,
+    }
+
+
+@pytest.mark.parametrize("fault", FAULTS)
+def test_fault_is_bounded_classified_and_leak_free(fault):
+    """Every fault ends within the timeout as an UnicomApiError without leaking or blocking the loop."""
+    result = asyncio.run(_fetch_through_faults((fault,)))
+
+    assert result["worst"] < TIMEOUT + MARGIN
+    assert result["max_lag"] < MAX_LOOP_LAG
+    assert all(isinstance(outcome, UnicomApiError) for outcome in result["outcomes"])
+    assert result["leaked"] == []
+    assert result["acquired"] == 0
+    assert result["server_connections"] == result["pooled"]
+
+
+def test_mixed_faults_leave_no_connections_behind():
+    """A mix of healthy and faulty responses returns every connection to the pool."""
+
+    async def _run():
+        server = ReplayServer(replay_transport(), rate=0.5, drip_interval=0.02, seed=7)
+        base_url = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                client = UnicomClient(
+                    AiohttpTransport(session), timeout=TIMEOUT, endpoints=EndpointPool([base_url])
+                )
+                results = [
+                    result
+                    async for result in client.async_fetch_many(
+                        (f"mixed-{index}" for index in range(40)), concurrency=8
+                    )
+                ]
+                for _ in range(100):
+                    if connection_counts(session.connector)[1] == server.open_connections:
+                        break
+                    await asyncio.sleep(0.01)
+                return results, connection_counts(session.connector), server.open_connections
+        finally:
+            await server.close()
+
+    results, (acquired, pooled), server_connections = asyncio.run(_run())
+
+    assert len(results) == 40
+    assert any(error is None for _, _, error in results)
+    assert all(error is None or isinstance(error, UnicomApiError) for _, _, error in results)
+    assert acquired == 0
+    assert server_connections == pooled
+
+
+class _FailFastTransport:
+    """sspbigball fails at once while sspbalcbroadcast never answers."""
+
+    def __init__(self):
+        self.hung = asyncio.Event()
+        self.cancelled = False
+
+    async def post(self, url, payload):
+        if not url.endswith(BALANCE_ENDPOINT):
+            return 502, "Bad Gateway", None
+        self.hung.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_failed_fetch_waits_for_the_cancelled_sibling():
+    """async_fetch only raises once the other request has really finished."""
+
+    async def _run():
+        transport = _FailFastTransport()
+        client = UnicomClient(transport, timeout=5)
+        before = asyncio.all_tasks()
+        with pytest.raises(UnicomApiError):
+            await client.async_fetch("fail-fast")
+        return transport, [task for task in asyncio.all_tasks() - before if not task.done()]
+
+    transport, pending = asyncio.run(_run())
+
+    assert transport.hung.is_set()
+    assert transport.cancelled
+    assert pending == []
+
+
+def test_closing_fetch_many_early_cancels_running_fetches():
+    """A consumer that stops early leaves no fetch running."""
+
+    class _SlowTransport:
+        async def post(self, url, payload):
+            await asyncio.sleep(3600)
+
+    async def _run():
+        client = UnicomClient(_SlowTransport(), timeout=3600)
+        before = asyncio.all_tasks()
+        results = client.async_fetch_many((f"slow-{index}" for index in range(10)), concurrency=4)
+        with pytest.raises(asyncio.TimeoutError):
+            async with asyncio.timeout(0.05):
+                await results.__anext__()
+        await results.aclose()
+        return [task for task in asyncio.all_tasks() - before if not task.done()]
+
+    assert asyncio.run(_run()) == []
@@ -0,0 +1,25 @@
+"""Command line tools run against recorded responses."""
+import asyncio
+import json
+import shutil
+
+from custom_components.unicom_bill_info.cli import build_parser
+
+from .conftest import FIXTURES
+
+
+def test_memprofile_keeps_the_previous_snapshot_on_errors(tmp_path, capsys):
+    """API errors in the recordings count as failed refreshes instead of aborting the run."""
+    shutil.copytree(FIXTURES, tmp_path, dirs_exist_ok=True)
+    # 第二份余额响应为 502：每个账户交替成功和失败
+    with open(tmp_path / "1715000000000000002-0002-sspbalcbroadcast.json", "w", encoding="utf-8") as file:
+        json.dump({"endpoint": "sspbalcbroadcast", "status": 502, "retry_after": None, "body": "Bad Gateway"}, file)
+
+    args = build_parser().parse_args(
+        ["memprofile", str(tmp_path), "--accounts", "4", "--refreshes", "3", "--top", "1"]
+    )
+    assert asyncio.run(args.handler(args)) == 0
+
+    err = capsys.readouterr().err
+    assert "bytes/account retained" in err
+    assert "refreshes failed and kept the previous snapshot" in err
@@ -0,0 +1,44 @@
+"""Config and options flows."""
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.data_entry_flow import FlowResultType  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+
+def _defaults(result):
+    """Return {field: default} of a shown form."""
+    return {
+        str(key): key.default() for key in result["data_schema"].schema
+    }
+
+
+async def test_options_form_shows_the_saved_options(hass, replay_server):
+    """Reopening the options form keeps earlier changes, including the OpenID."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "options-0000001")
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    changed = {
+        "name": "副卡",
+        "openid": "options-0000002",
+        "refresh_interval": 30,
+        "create_individual_sensors": True,
+        "stale_grace": 10,
+    }
+    result = await hass.config_entries.options.async_configure(result["flow_id"], changed)
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert _defaults(result) == changed
+
+    # 未修改直接提交，唯一 ID 和选项都保持不变
+    result = await hass.config_entries.options.async_configure(result["flow_id"], _defaults(result))
+    await hass.async_block_till_done()
+    assert entry.unique_id == "options-0000002"
+    assert entry.options == changed
@@ -0,0 +1,163 @@
+"""One coordinator shared by every entry of the same OpenID."""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.config_entries import SOURCE_REAUTH, ConfigEntryState  # noqa: E402
+from pytest_homeassistant_custom_component.common import MockConfigEntry  # noqa: E402
+
+from custom_components.unicom_bill_info.api import UnicomAuthError  # noqa: E402
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+OPENID = "shared-0000001"
+
+
+async def _async_add_sharing_entry(hass, name, **kwargs):
+    """Add an entry with other settings for an OpenID that is already configured."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, version=2, title=name,
+        data={"name": name, "openid": OPENID, "refresh_interval": 30}, **kwargs,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_unloading_the_first_entry_keeps_the_coordinator(hass, replay_server):
+    """The coordinator belongs to no entry and keeps polling for the remaining one."""
+    await async_setup_integration(hass, replay_server)
+    first = await async_add_account(hass, OPENID)
+    second = await _async_add_sharing_entry(hass, "第二个")
+    coordinator = first.runtime_data
+    assert second.runtime_data is coordinator
+    assert coordinator.config_entry is None
+
+    assert await hass.config_entries.async_unload(first.entry_id)
+    await hass.async_block_till_done()
+    assert coordinator.entry_ids == {second.entry_id}
+    assert hass.data[DOMAIN]["coordinators"][OPENID] is coordinator
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator._unsub_refresh is not None
+
+    assert await hass.config_entries.async_unload(second.entry_id)
+    await hass.async_block_till_done()
+    assert OPENID not in hass.data[DOMAIN]["coordinators"]
+    assert coordinator._unsub_refresh is None
+
+
+async def test_sharing_entry_settings_apply_to_the_coordinator(hass, replay_server):
+    """The coordinator polls with the settings of the entry loaded last."""
+    await async_setup_integration(hass, replay_server)
+    first = await async_add_account(hass, OPENID)
+    coordinator = first.runtime_data
+    assert coordinator._base_update_interval == timedelta(minutes=15)
+
+    await _async_add_sharing_entry(hass, "第二个", options={"stale_grace": 10})
+    assert coordinator._base_update_interval == timedelta(minutes=30)
+    assert coordinator.update_interval > timedelta(minutes=15)
+    assert coordinator.stale_grace == timedelta(minutes=10)
+
+
+async def test_options_change_is_synced_to_sharing_entries(hass, replay_server):
+    """Changing the interval on one entry updates every entry sharing the coordinator."""
+    await async_setup_integration(hass, replay_server)
+    first = await async_add_account(hass, OPENID)
+    second = await _async_add_sharing_entry(hass, "第二个")
+    coordinator = first.runtime_data
+
+    result = await hass.config_entries.options.async_init(first.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {**first.data, "refresh_interval": 45, "stale_grace": 5},
+    )
+    await hass.async_block_till_done()
+
+    assert second.options["refresh_interval"] == 45
+    assert second.options["stale_grace"] == 5
+    assert second.data["refresh_interval"] == 30
+    assert first.runtime_data is second.runtime_data is coordinator
+    assert coordinator._base_update_interval == timedelta(minutes=45)
+    assert coordinator.stale_grace == timedelta(minutes=5)
+
+
+async def test_rejected_openid_starts_reauth_on_every_entry(hass, replay_server):
+    """An auth failure asks every entry using the coordinator for a new OpenID."""
+    await async_setup_integration(hass, replay_server)
+    first = await async_add_account(hass, OPENID)
+    second = await _async_add_sharing_entry(hass, "第二个")
+    coordinator = first.runtime_data
+
+    with patch.object(coordinator.client, "async_fetch", side_effect=UnicomAuthError("invalid openid")):
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    flows = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    assert {
+        flow["context"]["entry_id"] for flow in flows if flow["context"]["source"] == SOURCE_REAUTH
+    } == {first.entry_id, second.entry_id}
+
+
+async def test_polling_stops_only_when_every_entry_disables_it(hass, replay_server):
+    """Disabling polling on one of two entries keeps the shared coordinator polling."""
+    await async_setup_integration(hass, replay_server)
+    first = await _async_add_sharing_entry(hass, "第一个", unique_id=OPENID, pref_disable_polling=True)
+    coordinator = first.runtime_data
+    await coordinator.async_refresh()
+    assert coordinator._unsub_refresh is None
+
+    await _async_add_sharing_entry(hass, "第二个")
+    await coordinator.async_refresh()
+    assert coordinator._unsub_refresh is not None
+
+
+async def test_exact_duplicate_is_removed_without_being_set_up(hass, replay_server):
+    """Migrating a copy of an earlier entry removes it before it creates any entity."""
+    data = {"name": "联通数据", "openid": OPENID, "refresh_interval": 15}
+    original = MockConfigEntry(domain=DOMAIN, version=1, title="联通数据", data=data)
+    duplicate = MockConfigEntry(domain=DOMAIN, version=1, title="联通数据", data=dict(data))
+    # 名称不同的条目保留，与原条目共用协调器
+    renamed = MockConfigEntry(domain=DOMAIN, version=1, title="副卡", data={**data, "name": "副卡"})
+    for entry in (original, duplicate, renamed):
+        entry.add_to_hass(hass)
+    states = []
+    original_remove = hass.config_entries.async_remove
+
+    async def _async_remove(entry_id):
+        states.append(hass.config_entries.async_get_entry(entry_id).state)
+        return await original_remove(entry_id)
+
+    with patch.object(hass.config_entries, "async_remove", _async_remove):
+        await async_setup_integration(hass, replay_server)
+        await hass.async_block_till_done()
+
+    assert states == [ConfigEntryState.MIGRATION_ERROR]
+    assert {entry.entry_id for entry in hass.config_entries.async_entries(DOMAIN)} == {
+        original.entry_id, renamed.entry_id,
+    }
+    assert original.state is ConfigEntryState.LOADED
+    assert (original.unique_id, renamed.unique_id) == (OPENID, None)
+    assert hass.data[DOMAIN]["coordinators"][OPENID].entry_ids == {
+        original.entry_id, renamed.entry_id,
+    }
+
+
+async def test_removing_an_entry_deletes_its_history(hass, hass_storage, replay_server):
+    """The history store goes away with the entry."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, OPENID)
+    key = f"{DOMAIN}.history.{entry.entry_id}"
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert key in hass_storage
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert key not in hass_storage
@@ -0,0 +1,45 @@
+"""A coordinator refresh ends by its deadline whatever the upstream does."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.helpers.update_coordinator import UpdateFailed  # noqa: E402
+
+from custom_components.unicom_bill_info import coordinator as coordinator_module  # noqa: E402
+from custom_components.unicom_bill_info.ratelimit import PRIORITY_SCHEDULED  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+TIMEOUT = 0.3
+MARGIN = 0.2
+SLACK = 0.2
+HOSTS = 3
+
+
+@pytest.mark.parametrize("fault", ["hang", "slow_drip"])
+async def test_refresh_fails_within_its_deadline(hass, replay_server, monkeypatch, fault):
+    """Failing over through several stalled hosts gives up at the refresh deadline."""
+    # 同一服务器列出多次，相当于多个都无响应的主机：逐个超时的总时间超过刷新时限
+    await async_setup_integration(hass, replay_server, base_urls=[replay_server.base_url] * HOSTS)
+    entry = await async_add_account(hass, "deadline-0000001")
+    coordinator = entry.runtime_data
+    coordinator.client.timeout = TIMEOUT
+    monkeypatch.setattr(coordinator_module, "REFRESH_DEADLINE_MARGIN", MARGIN)
+    monkeypatch.setitem(coordinator_module.REQUEST_DEADLINES, PRIORITY_SCHEDULED, 0)
+    deadline = TIMEOUT + MARGIN
+    assert deadline < HOSTS * TIMEOUT
+    replay_server.rate, replay_server.faults = 1.0, (fault,)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    with pytest.raises(UpdateFailed, match="did not finish"):
+        await coordinator._async_update_data()
+    elapsed = loop.time() - start
+
+    assert deadline <= elapsed < deadline + SLACK
+    assert coordinator._fetch_task is None
+    assert replay_server.injected[fault] >= 2
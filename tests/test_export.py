@@ -0,0 +1,138 @@
+"""Snapshot exporter batching, retries and file rotation."""
+import asyncio
+import json
+
+from custom_components.unicom_bill_info.export import JsonlFileSink, SnapshotExporter
+
+
+class _Sink:
+    """Sink that records batches and fails while told to."""
+
+    def __init__(self, failures=0, delay=0):
+        self.batches = []
+        self.failures = failures
+        self.delay = delay
+        self.active = 0
+        self.most_active = 0
+
+    async def async_write(self, records):
+        self.active += 1
+        self.most_active = max(self.most_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise OSError("sink unavailable")
+            self.batches.append([(record["account"], record["data"]) for record in records])
+        finally:
+            self.active -= 1
+
+
+def test_unchanged_snapshots_are_sent_once():
+    """Snapshots are merged per account and repeats are suppressed."""
+
+    async def _run():
+        sink = _Sink()
+        exporter = SnapshotExporter([sink], flush_interval=0)
+        exporter.submit("a", {"balance": 1})
+        exporter.submit("a", {"balance": 2})
+        exporter.submit("b", {"balance": 3})
+        await exporter.async_flush()
+        exporter.submit("a", {"balance": 2})
+        await exporter.async_flush()
+        return sink, exporter
+
+    sink, exporter = asyncio.run(_run())
+
+    assert sink.batches == [[("a", {"balance": 2}), ("b", {"balance": 3})]]
+    assert exporter.batches == 1
+    assert exporter.suppressed == 1
+
+
+def test_failed_writes_are_retried_only_to_the_failing_sink():
+    """A failed record is resent after the retry delay and counts as sent only once delivered."""
+
+    async def _run():
+        healthy, flaky = _Sink(), _Sink(failures=1)
+        exporter = SnapshotExporter([healthy, flaky], flush_interval=0, retry_interval=0.01)
+        exporter.submit("a", {"balance": 1})
+        await exporter.async_flush()
+        # 还没有写入所有输出端，相同的快照仍会排队，并覆盖等待重发的记录
+        exporter.submit("a", {"balance": 1})
+        suppressed_before_retry = exporter.suppressed
+        await asyncio.sleep(0.05)
+        exporter.submit("a", {"balance": 1})
+        return healthy, flaky, exporter, suppressed_before_retry
+
+    healthy, flaky, exporter, suppressed_before_retry = asyncio.run(_run())
+
+    assert suppressed_before_retry == 0
+    assert flaky.batches == [[("a", {"balance": 1})]]
+    assert healthy.batches == [[("a", {"balance": 1})], [("a", {"balance": 1})]]
+    assert exporter.suppressed == 1
+    assert exporter._timer is None
+
+
+def test_concurrent_flushes_do_not_overlap():
+    """A flush from the timer and one from shutdown write one after the other."""
+
+    async def _run():
+        sink = _Sink(delay=0.02)
+        exporter = SnapshotExporter([sink], flush_interval=0)
+        exporter.submit("a", {"balance": 1})
+        first = asyncio.ensure_future(exporter.async_flush())
+        await asyncio.sleep(0)
+        exporter.submit("a", {"balance": 2})
+        await asyncio.gather(first, exporter.async_flush())
+        return sink
+
+    sink = asyncio.run(_run())
+
+    assert sink.most_active == 1
+    assert sink.batches == [[("a", {"balance": 1})], [("a", {"balance": 2})]]
+
+
+def test_forget_drops_records_waiting_for_retry():
+    """An account that stops being polled is not resent."""
+
+    async def _run():
+        sink = _Sink(failures=1)
+        exporter = SnapshotExporter([sink], flush_interval=0, retry_interval=0.01)
+        exporter.submit("a", {"balance": 1})
+        await exporter.async_flush()
+        exporter.forget("a")
+        await asyncio.sleep(0.05)
+        return sink
+
+    assert asyncio.run(_run()).batches == []
+
+
+def test_file_sink_rotates_and_keeps_the_newest_backups(tmp_path):
+    """The file is shifted to .1, .2 ... when full and the oldest backup is dropped."""
+    path = tmp_path / "export" / "snapshots.jsonl"
+    # 每行约 35 字节，一个文件只放得下一行
+    sink = JsonlFileSink(str(path), max_bytes=60, backups=2)
+
+    for index in range(5):
+        asyncio.run(sink.async_write([{"account": "a", "data": {"n": index}}]))
+
+    def _numbers(name):
+        with open(tmp_path / "export" / name, encoding="utf-8") as file:
+            return [json.loads(line)["data"]["n"] for line in file]
+
+    assert _numbers("snapshots.jsonl") == [4]
+    assert _numbers("snapshots.jsonl.1") == [3]
+    assert _numbers("snapshots.jsonl.2") == [2]
+    assert not (tmp_path / "export" / "snapshots.jsonl.3").exists()
+
+
+def test_file_sink_without_backups_starts_over(tmp_path):
+    """With no backups the full file is replaced."""
+    path = tmp_path / "snapshots.jsonl"
+    sink = JsonlFileSink(str(path), max_bytes=60, backups=0)
+
+    for index in range(3):
+        asyncio.run(sink.async_write([{"account": "a", "data": {"n": index}}]))
+
+    assert [json.loads(line)["data"]["n"] for line in path.read_text(encoding="utf-8").splitlines()] == [2]
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["snapshots.jsonl"]
@@ -0,0 +1,112 @@
+"""Monthly history backfilled from the CSV history source."""
+import asyncio
+import csv
+import os
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+from custom_components.unicom_bill_info.history import (  # noqa: E402
+    HISTORY_MONTHS,
+    CsvHistorySource,
+    past_months,
+)
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+OPENID = "history-0000001"
+ENTRY_ID = "history0000001"
+
+
+async def _async_synced(history):
+    """Wait for the background sync started at setup."""
+    async with asyncio.timeout(5):
+        while history.unsynced_months():
+            await asyncio.sleep(0.01)
+
+
+def _write_history(path, rows):
+    """Write a history CSV file with the given (month, real_fee) rows."""
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["openid", "month", "real_fee"])
+        for month, fee in rows:
+            writer.writerow([OPENID, month, fee])
+
+
+async def test_only_unsynced_months_are_fetched(hass, hass_storage, replay_server, tmp_path):
+    """Stored months are kept, missing ones come from the file and nothing is fetched twice."""
+    stored, from_file, absent = past_months(dt_util.now(), 3)
+    hass_storage[f"{DOMAIN}.history.{ENTRY_ID}"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.history.{ENTRY_ID}",
+        "data": {"months": {stored: {"real_fee": 30.0, "final": True}}, "missing": []},
+    }
+    path = tmp_path / "history.csv"
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["openid", "month", "data_used", "real_fee"])
+        writer.writerow([OPENID, stored, "1.0", "99.0"])
+        writer.writerow([OPENID, from_file, "2048", "58.5"])
+        writer.writerow(["someone-else", absent, "1.0", "1.0"])
+
+    fetched = []
+    original = CsvHistorySource.async_fetch_month
+
+    async def _recording_fetch(source, openid, month):
+        fetched.append(month)
+        return await original(source, openid, month)
+
+    await async_setup_integration(hass, replay_server, history_file=str(path))
+    with patch.object(CsvHistorySource, "async_fetch_month", _recording_fetch):
+        entry = await async_add_account(hass, OPENID, entry_id=ENTRY_ID)
+        history = hass.data[DOMAIN]["history"][ENTRY_ID]
+        await _async_synced(history)
+
+        assert stored not in fetched
+        assert len(fetched) == HISTORY_MONTHS - 1
+        response = await hass.services.async_call(
+            DOMAIN, "get_history", {"config_entry_id": ENTRY_ID},
+            blocking=True, return_response=True,
+        )
+        months = {row["month"]: row for row in response["months"]}
+        assert months[stored]["real_fee"] == 30.0
+        assert months[from_file]["data_used"] == 2048.0
+        assert months[from_file]["real_fee"] == 58.5
+        assert absent not in months
+
+        # 重新加载后所有月份都已同步或已知无数据，不再查询
+        fetched.clear()
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        await _async_synced(hass.data[DOMAIN]["history"][ENTRY_ID])
+        assert fetched == []
+
+
+async def test_months_added_to_the_file_later_are_backfilled(hass, replay_server, tmp_path):
+    """A month missing from the file is queried again once the file changes."""
+    early, late = past_months(dt_util.now(), 2)
+    path = tmp_path / "history.csv"
+    _write_history(path, [(early, "40.0")])
+    await async_setup_integration(hass, replay_server, history_file=str(path))
+    entry = await async_add_account(hass, OPENID, entry_id=ENTRY_ID)
+    await _async_synced(hass.data[DOMAIN]["history"][ENTRY_ID])
+    assert late not in hass.data[DOMAIN]["history"][ENTRY_ID].months
+
+    _write_history(path, [(early, "40.0"), (late, "41.5")])
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    history = hass.data[DOMAIN]["history"][ENTRY_ID]
+    async with asyncio.timeout(5):
+        while late not in history.months:
+            await asyncio.sleep(0.01)
+    assert history.months[late]["real_fee"] == 41.5
@@ -0,0 +1,123 @@
+"""Incrementally maintained household totals."""
+from custom_components.unicom_bill_info.household import MIN_HEADROOM, HouseholdAggregate
+
+
+def _snapshot(balance=None, real_fee=None, data_used=None, data_available=None):
+    return {
+        "balance": balance,
+        "real_fee": real_fee,
+        "data_used": data_used,
+        "data_available": data_available,
+    }
+
+
+class _FakeCoordinator:
+    """Just enough of the coordinator for HouseholdAggregate.track."""
+
+    def __init__(self, openid, data):
+        self.openid = openid
+        self.data = data
+        self.listeners = []
+
+    def async_add_listener(self, update_callback, keys):
+        self.listeners.append(update_callback)
+        return lambda: self.listeners.remove(update_callback)
+
+    def set_data(self, data):
+        self.data = data
+        for update_callback in list(self.listeners):
+            update_callback()
+
+
+def test_totals_follow_each_account_update():
+    """Replacing one account's snapshot adjusts the sums by its difference only."""
+    household = HouseholdAggregate()
+    household.update("a", _snapshot(balance=10.5, real_fee=3.0, data_used=100.0, data_available=900.0))
+    household.update("b", _snapshot(balance=20.25, real_fee=1.0, data_used=50.0, data_available=300.0))
+
+    assert household.value("balance") == 30.75
+    assert household.value("real_fee") == 4.0
+    assert household.value("data_used") == 150.0
+    assert household.value(MIN_HEADROOM) == 300.0
+
+    household.update("b", _snapshot(balance=19.25, real_fee=2.0, data_used=80.0, data_available=1200.0))
+    assert household.value("balance") == 29.75
+    assert household.value("data_used") == 180.0
+    assert household.value(MIN_HEADROOM) == 900.0
+
+    household.remove("a")
+    assert household.value("balance") == 19.25
+    assert household.value(MIN_HEADROOM) == 1200.0
+
+    household.remove("b")
+    assert household.value("balance") is None
+    assert household.value(MIN_HEADROOM) is None
+
+
+def test_unknown_fields_are_left_out():
+    """Accounts without a value do not count towards that total."""
+    household = HouseholdAggregate()
+    household.update("a", _snapshot(balance=5.0))
+    household.update("b", _snapshot(data_available=10.0))
+
+    assert household.value("balance") == 5.0
+    assert household.value("real_fee") is None
+    assert household.value(MIN_HEADROOM) == 10.0
+
+
+def test_heap_stays_proportional_to_the_accounts():
+    """Stale heap entries are compacted away under many updates."""
+    household = HouseholdAggregate()
+    for step in range(1000):
+        household.update(f"account-{step % 3}", _snapshot(data_available=float(1000 - step)))
+
+    assert household.value(MIN_HEADROOM) == 1.0
+    assert len(household._heap) <= 2 * 3 + 16
+
+
+def test_listeners_hear_only_their_keys():
+    """A listener is called only when one of its keys changes, and can be removed."""
+    household = HouseholdAggregate()
+    calls = {"balance": 0, MIN_HEADROOM: 0}
+    remove = household.add_listener(lambda: calls.__setitem__("balance", calls["balance"] + 1), {"balance"})
+    household.add_listener(lambda: calls.__setitem__(MIN_HEADROOM, calls[MIN_HEADROOM] + 1), {MIN_HEADROOM})
+
+    household.update("a", _snapshot(balance=1.0, data_available=50.0))
+    household.update("a", _snapshot(balance=1.0, data_available=50.0))
+    # 另一个账户的剩余流量更大，最小值不变
+    household.update("b", _snapshot(balance=2.0, data_available=80.0))
+    assert calls == {"balance": 2, MIN_HEADROOM: 1}
+
+    remove()
+    household.update("a", _snapshot(balance=3.0, data_available=50.0))
+    assert calls == {"balance": 2, MIN_HEADROOM: 1}
+
+
+def test_tracking_a_coordinator_is_idempotent():
+    """Tracking twice counts the account once; untrack and close stop following."""
+    household = HouseholdAggregate()
+    first = _FakeCoordinator("a", _snapshot(balance=1.0))
+    second = _FakeCoordinator("b", _snapshot(balance=2.0))
+
+    household.track(first)
+    household.track(first)
+    household.track(second)
+    assert household.account_count == 2
+    assert len(first.listeners) == 1
+    assert household.value("balance") == 3.0
+
+    first.set_data(_snapshot(balance=4.0))
+    assert household.value("balance") == 6.0
+
+    # 同一 OpenID 的另一个协调器停止时不影响正在跟踪的协调器
+    household.untrack(_FakeCoordinator("a", None))
+    assert household.value("balance") == 6.0
+
+    household.untrack(first)
+    assert first.listeners == []
+    assert household.value("balance") == 2.0
+
+    household.close()
+    assert second.listeners == []
+    assert household.account_count == 0
+    assert household.value("balance") is None
@@ -0,0 +1,53 @@
+"""Accounts imported from configuration.yaml."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.config_entries import ConfigEntryState  # noqa: E402
+
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+from custom_components.unicom_bill_info.coordinator import (  # noqa: E402
+    ChinaUnicomDataUpdateCoordinator,
+)
+
+from .common import async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+ACCOUNTS = 6
+CONCURRENCY = 2
+
+
+async def test_imports_run_concurrently_up_to_the_admission_limit(hass, replay_server, monkeypatch):
+    """Every import starts at once and the admission queue alone bounds the first refreshes."""
+    active = 0
+    peak = 0
+    original = ChinaUnicomDataUpdateCoordinator.async_first_refresh
+
+    async def _slow_first_refresh(coordinator):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        try:
+            await original(coordinator)
+        finally:
+            active -= 1
+
+    monkeypatch.setattr(ChinaUnicomDataUpdateCoordinator, "async_first_refresh", _slow_first_refresh)
+    await async_setup_integration(
+        hass,
+        replay_server,
+        startup={"concurrency": CONCURRENCY, "spacing": 0},
+        # 导入在组件设置期间就开始，来不及等 async_setup_integration 放开限流
+        rate_limit={"requests_per_minute": 600, "burst": 100},
+        accounts=[{"openid": f"import-{index:07d}"} for index in range(ACCOUNTS)],
+    )
+    await hass.async_block_till_done()
+
+    entries = hass.config_entries.async_entries(DOMAIN)
+    assert len(entries) == ACCOUNTS
+    assert all(entry.state is ConfigEntryState.LOADED for entry in entries)
+    assert peak == CONCURRENCY
@@ -0,0 +1,68 @@
+"""Importing the integration stays cheap.
+
+Home Assistant 在启动时导入集成包来读取 CONFIG_SCHEMA；客户端、协调器和平台等
+只在设置时才加载，这里用 python -X importtime 检查导入时间和导入的模块。
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("voluptuous")
+
+PACKAGE = "custom_components.unicom_bill_info"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 包自身（不含 Home Assistant 启动前已经加载的 voluptuous）的累计导入时间上限，微秒
+IMPORT_BUDGET_US = 50_000
+
+# 导入集成包时不应加载的模块
+DEFERRED = (
+    "aiohttp",
+    "homeassistant.helpers.config_validation",
+    f"{PACKAGE}.accounts",
+    f"{PACKAGE}.api",
+    f"{PACKAGE}.coordinator",
+    f"{PACKAGE}.export",
+    f"{PACKAGE}.metrics",
+    f"{PACKAGE}.ratelimit",
+    f"{PACKAGE}.sensor",
+    f"{PACKAGE}.services",
+    f"{PACKAGE}.websocket_api",
+)
+
+
+def _import_times():
+    """Import the package in a fresh interpreter and return {module: cumulative µs}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import voluptuous; import {PACKAGE}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_loads_only_the_config_schema():
+    """Client, coordinator, platforms and optional features are not imported."""
+    times = _import_times()
+
+    assert PACKAGE in times
+    assert [module for module in DEFERRED if module in times] == []
+
+
+def test_import_time_is_within_budget():
+    """The package itself imports within the budget."""
+    # 取三次中最快的一次，减少机器负载的影响
+    best = min(_import_times()[PACKAGE] for _ in range(3))
+
+    assert best < IMPORT_BUDGET_US, f"importing {PACKAGE} took {best} µs"
@@ -0,0 +1,70 @@
+"""Memory retained per account inside Home Assistant.
+
+命令行的 memprofile 只测量客户端和快照；这里测量完整的账户：协调器、历史记录、
+启用独立实体时的 17 个实体和它们的监听器，用 pytest -s 运行时打印占用最多的分配位置。
+"""
+import gc
+import logging
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+ACCOUNTS = 20
+REFRESHES = 5
+
+# 每个账户保留的字节数上限
+ACCOUNT_BUDGET = 256 * 1024
+# 首轮之后每个账户每次刷新允许的增长
+REFRESH_GROWTH_BUDGET = 2_000
+
+
+def _retained(snapshot, since):
+    return sum(stat.size_diff for stat in snapshot.compare_to(since, "filename"))
+
+
+async def test_memory_per_account(hass, replay_server, caplog):
+    """Accounts with all their entities stay within the budget and stop growing."""
+    # 捕获的日志记录会一直保留到测试结束，不计入账户的内存
+    caplog.set_level(logging.CRITICAL)
+    await async_setup_integration(hass, replay_server)
+    # 平台加载、模块导入等一次性开销不计入
+    await async_add_account(hass, "memory-warmup", create_individual_sensors=True)
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        gc.collect()
+        empty = tracemalloc.take_snapshot().filter_traces(filters)
+        entries = [
+            await async_add_account(hass, f"memory-{index:04d}", create_individual_sensors=True)
+            for index in range(ACCOUNTS)
+        ]
+        gc.collect()
+        baseline = tracemalloc.take_snapshot().filter_traces(filters)
+        for _ in range(REFRESHES):
+            for entry in entries:
+                await entry.runtime_data.async_refresh()
+            await hass.async_block_till_done()
+        gc.collect()
+        final = tracemalloc.take_snapshot().filter_traces(filters)
+    finally:
+        tracemalloc.stop()
+
+    per_account = _retained(final, empty) / ACCOUNTS
+    growth = _retained(final, baseline) / ACCOUNTS / REFRESHES
+    print(
+        f"\n{ACCOUNTS} accounts with 17 entities, {REFRESHES} refreshes: "
+        f"{per_account:.0f} bytes/account retained, {growth:+.0f} bytes/account per refresh"
+    )
+    for stat in final.compare_to(empty, "lineno")[:10]:
+        print(f"  {stat}")
+
+    assert all(entry.runtime_data.last_update_success for entry in entries)
+    assert per_account < ACCOUNT_BUDGET
+    assert growth < REFRESH_GROWTH_BUDGET
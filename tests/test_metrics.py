@@ -0,0 +1,54 @@
+"""Prometheus metrics rendered from cached per-account lines."""
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+OPENID = "metrics-0000001"
+
+
+async def test_rendered_text_is_reused_until_something_changes(hass, replay_server):
+    """Gauges survive unrelated refreshes and the text is rebuilt only when needed."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, OPENID)
+    coordinator = entry.runtime_data
+    renderer = hass.data[DOMAIN]["metrics"]
+    account = renderer._accounts[OPENID]
+
+    body = renderer.render()
+    assert renderer.render() is body
+    gauges = account._snapshot_lines
+    assert gauges is not None
+
+    # 相同的快照刷新后只有运行统计重新生成
+    await coordinator.async_refresh()
+    refreshed = renderer.render()
+    assert refreshed is not body
+    assert "unicom_refresh_duration_seconds_count" in refreshed
+    assert account._snapshot_lines is gauges
+    assert renderer.render() is refreshed
+
+    # 指标不使用的字段变化时数值指标仍然有效
+    unrelated = {**coordinator.data, "credit_value": coordinator.data["credit_value"] + 1}
+    with patch.object(coordinator.client, "async_fetch", return_value=unrelated):
+        await coordinator.async_refresh()
+    renderer.render()
+    assert account._snapshot_lines is gauges
+
+    changed = {**unrelated, "balance": 12.5}
+    with patch.object(coordinator.client, "async_fetch", return_value=changed):
+        await coordinator.async_refresh()
+    assert "unicom_balance_cny{" in renderer.render()
+    assert " 12.5\n" in renderer.render()
+    assert account._snapshot_lines is not gauges
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert renderer.render() == ""
@@ -0,0 +1,156 @@
+"""Token bucket limiter and startup admission queue."""
+import asyncio
+import time
+
+import pytest
+
+from custom_components.unicom_bill_info.ratelimit import (
+    PRIORITY_BACKFILL,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_SCHEDULED,
+    AdmissionQueue,
+    RequestShed,
+    TokenBucketLimiter,
+)
+
+
+def test_burst_is_granted_without_waiting():
+    """Requests within the bucket size get a token at once."""
+
+    async def _run():
+        limiter = TokenBucketLimiter(rate=1, burst=3)
+        return [await limiter.acquire() for _ in range(3)], limiter.queue_depth
+
+    waits, depth = asyncio.run(_run())
+
+    assert waits == [0.0, 0.0, 0.0]
+    assert depth == 0
+
+
+def test_queued_requests_are_served_by_priority():
+    """Once the bucket is empty, interactive requests go before scheduled and backfill ones."""
+
+    async def _run():
+        limiter = TokenBucketLimiter(rate=50, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def _request(priority, name):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.ensure_future(_request(PRIORITY_BACKFILL, "backfill")),
+            asyncio.ensure_future(_request(PRIORITY_SCHEDULED, "scheduled")),
+            asyncio.ensure_future(_request(PRIORITY_INTERACTIVE, "interactive")),
+        ]
+        await asyncio.sleep(0)
+        peak = limiter.queue_depth
+        await asyncio.gather(*tasks)
+        return order, peak, limiter
+
+    order, peak, limiter = asyncio.run(_run())
+
+    assert order == ["interactive", "scheduled", "backfill"]
+    assert peak == 3
+    assert limiter.peak_depth == 3
+    assert limiter.last_wait > 0
+
+
+def test_requests_that_would_miss_their_deadline_are_shed():
+    """A request that cannot start before its deadline fails at once instead of waiting."""
+
+    async def _run():
+        limiter = TokenBucketLimiter(rate=1, burst=1)
+        await limiter.acquire()
+        started = time.monotonic()
+        with pytest.raises(RequestShed):
+            await limiter.acquire(PRIORITY_SCHEDULED, deadline=0.2)
+        return time.monotonic() - started, limiter
+
+    elapsed, limiter = asyncio.run(_run())
+
+    assert elapsed < 0.1
+    assert limiter.shed_count == 1
+    assert limiter.queue_depth == 0
+
+
+def test_pause_holds_back_tokens():
+    """After upstream throttling no token is handed out until the pause ends."""
+
+    async def _run():
+        limiter = TokenBucketLimiter(rate=1000, burst=5)
+        limiter.pause(0.1)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(_run()) >= 0.09
+
+
+def test_listeners_follow_every_queue_change():
+    """Listeners hear about enqueues, grants, sheds and cancellations, and can be removed."""
+
+    async def _run():
+        limiter = TokenBucketLimiter(rate=20, burst=1)
+        depths = []
+        remove = limiter.add_listener(lambda: depths.append(limiter.queue_depth))
+
+        await limiter.acquire()
+        assert depths == []  # 令牌充足时没有变化
+
+        granted = asyncio.ensure_future(limiter.acquire())
+        cancelled = asyncio.ensure_future(limiter.acquire(PRIORITY_BACKFILL))
+        await asyncio.sleep(0)
+        assert depths == [1, 2]
+
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert depths[-1] == 1
+
+        await granted
+        assert depths[-1] == 0
+        assert limiter.last_wait > 0
+
+        with pytest.raises(RequestShed):
+            await limiter.acquire(PRIORITY_SCHEDULED, deadline=0.001)
+        assert limiter.shed_count == 1
+        assert depths[-1] == 0
+
+        calls = len(depths)
+        remove()
+        await asyncio.sleep(0.1)
+        await limiter.acquire()
+        return calls, len(depths)
+
+    calls, after_remove = asyncio.run(_run())
+
+    assert calls == after_remove
+
+
+def test_admission_queue_limits_and_spaces_starts():
+    """At most concurrency blocks run at once and starts are spaced apart."""
+
+    async def _run():
+        admission = AdmissionQueue(concurrency=2, spacing=0.02)
+        starts = []
+        running = 0
+        most = 0
+
+        async def _work():
+            nonlocal running, most
+            async with admission.slot():
+                starts.append(time.monotonic())
+                running += 1
+                most = max(most, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(_work() for _ in range(5)))
+        return starts, most
+
+    starts, most = asyncio.run(_run())
+
+    assert most <= 2
+    # 单次休眠可能略有延后，按整体跨度检查间隔
+    assert starts[-1] - starts[0] >= 4 * 0.02 - 0.002
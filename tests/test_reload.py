@@ -0,0 +1,124 @@
+"""Reloading an entry many times leaves no tasks, timers or connections behind."""
+import asyncio
+import gc
+import logging
+import os
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.config_entries import ConfigEntryState  # noqa: E402
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE  # noqa: E402
+from homeassistant.helpers.aiohttp_client import async_get_clientsession  # noqa: E402
+from homeassistant.helpers.storage import Store  # noqa: E402
+
+from custom_components.unicom_bill_info.cli import connection_counts  # noqa: E402
+from custom_components.unicom_bill_info.coordinator import (  # noqa: E402
+    ChinaUnicomDataUpdateCoordinator,
+)
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+RELOADS = int(os.environ.get("RELOADS", 1000))
+WARMUP_RELOADS = 3
+OPENID = "reload-openid-0001"
+
+
+def _is_delayed_save(handle):
+    """Return True for a storage save that Home Assistant delayed."""
+    return isinstance(getattr(getattr(handle, "_callback", None), "__self__", None), Store)
+
+
+async def _footprint(hass, replay_server):
+    """Return everything a leaking reload would grow."""
+    await hass.async_block_till_done()
+    await _wait_for_idle_connections(hass, replay_server)
+    gc.collect()
+    acquired, pooled = connection_counts(async_get_clientsession(hass).connector)
+    return {
+        "tasks": len([task for task in asyncio.all_tasks() if not task.done()]),
+        # 注册表等存储的延迟保存由 Home Assistant 安排，不计入
+        "timers": len([
+            handle for handle in hass.loop._scheduled
+            if not handle.cancelled() and not _is_delayed_save(handle)
+        ]),
+        "bus_listeners": sum(
+            count for event_type, count in hass.bus.async_listeners().items()
+            if event_type != EVENT_HOMEASSISTANT_FINAL_WRITE
+        ),
+        "coordinators": sum(
+            isinstance(obj, ChinaUnicomDataUpdateCoordinator) for obj in gc.get_objects()
+        ),
+        "acquired": acquired,
+        # 服务端仍打开、客户端连接池却不知道的连接
+        "orphaned_connections": replay_server.open_connections - pooled,
+    }
+
+
+async def _wait_for_idle_connections(hass, replay_server):
+    """Give the server a moment to notice connections the client has closed."""
+    connector = async_get_clientsession(hass).connector
+    for _ in range(100):
+        if connection_counts(connector)[1] == replay_server.open_connections:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def _setup(hass, replay_server):
+    """Set up the integration with one account and warm it up."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, OPENID)
+    # 预热：前几次重新加载会导入模块、建立连接、安排注册表的延迟保存
+    for _ in range(WARMUP_RELOADS):
+        assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_reloads_do_not_leak(hass, replay_server):
+    """A thousand reloads keep tasks, timers, listeners and connections flat."""
+    entry = await _setup(hass, replay_server)
+    baseline = await _footprint(hass, replay_server)
+
+    for _ in range(RELOADS):
+        assert await hass.config_entries.async_reload(entry.entry_id)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert await _footprint(hass, replay_server) == baseline
+    assert baseline["coordinators"] == 1
+    assert baseline["acquired"] == 0
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_reload_during_refresh_cancels_the_request(hass, replay_server, caplog):
+    """Reloading while a request hangs cancels it and returns its connection."""
+    entry = await _setup(hass, replay_server)
+    baseline = await _footprint(hass, replay_server)
+    # 被取消的刷新会记录错误，日志记录引用旧的协调器，会被当成泄漏
+    caplog.set_level(logging.CRITICAL, logger="custom_components.unicom_bill_info")
+
+    for _ in range(20):
+        # 让下一次刷新的请求一直挂起，在请求进行中重新加载
+        replay_server.faults = ("hang",)
+        replay_server.rate = 1.0
+        hung = replay_server.injected.get("hang", 0)
+        refresh = hass.async_create_task(entry.runtime_data.async_refresh())
+        async with asyncio.timeout(5):
+            while replay_server.injected.get("hang", 0) == hung:
+                await asyncio.sleep(0.005)
+        replay_server.rate = 0.0
+        # 重新加载必须取消挂起的请求，否则刷新要等到请求超时才结束
+        async with asyncio.timeout(5):
+            assert await hass.config_entries.async_reload(entry.entry_id)
+            await refresh
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert await _footprint(hass, replay_server) == baseline
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
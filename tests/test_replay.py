@@ -0,0 +1,73 @@
+"""Entity states for recorded responses of unusual plans."""
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+
+from custom_components.unicom_bill_info.api import UnicomMalformedResponse  # noqa: E402
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+from .conftest import replay_transport  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+OPENID = "replay-0000001"
+
+
+def _state(hass, suffix):
+    """Return the state of one of the account's sensors."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"china_unicom_{OPENID}_{suffix}"
+    )
+    return hass.states.get(entity_id)
+
+
+@pytest.mark.parametrize("replay_server", ["unlimited_data"], indirect=True)
+async def test_unlimited_data_has_unknown_total_and_ratio(hass, replay_server):
+    """A -1 ratio with a 0.00MB total shows usage but no total, headroom or ratio."""
+    await async_setup_integration(hass, replay_server)
+    await async_add_account(hass, OPENID, create_individual_sensors=True)
+
+    data = _state(hass, "data")
+    assert float(data.state) == pytest.approx(12.3 * 1024)
+    assert data.attributes["总量"] is None
+    assert data.attributes["可用"] is None
+    assert data.attributes["使用比例"] is None
+    for suffix in ("data_total", "data_available", "data_usage_ratio"):
+        assert _state(hass, suffix).state == STATE_UNKNOWN
+    # 语音和短信仍按各自的额度显示
+    assert _state(hass, "voice_total").state == "500.0"
+    assert _state(hass, "voice_usage_ratio").state == "25.2"
+
+
+@pytest.mark.parametrize("replay_server", ["several_data_items"], indirect=True)
+async def test_several_data_items_are_summed(hass, replay_server):
+    """General, directed and carried-over data add up; the ratio follows the totals."""
+    await async_setup_integration(hass, replay_server)
+    await async_add_account(hass, OPENID, create_individual_sensors=True)
+
+    used = 4.52 * 1024 + 1024 + 512
+    total = 30 * 1024 + 20 * 1024 + 1024
+    assert float(_state(hass, "data").state) == pytest.approx(used)
+    assert float(_state(hass, "data_total").state) == pytest.approx(total)
+    assert float(_state(hass, "data_available").state) == pytest.approx(total - used)
+    assert float(_state(hass, "data_usage_ratio").state) == round(used / total * 100, 2)
+
+
+async def test_empty_balance_array_makes_entities_unavailable(hass, replay_server):
+    """An empty balance data array fails the refresh instead of showing zero fees."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, OPENID, create_individual_sensors=True)
+    assert _state(hass, "balance").state == "56.3"
+
+    replay_server.transport = replay_transport("empty_balance")
+    await entry.runtime_data.async_refresh()
+    await hass.async_block_till_done()
+
+    assert not entry.runtime_data.last_update_success
+    assert isinstance(entry.runtime_data.last_exception.__cause__, UnicomMalformedResponse)
+    for suffix in ("balance", "data", "total_owed"):
+        assert _state(hass, suffix).state == STATE_UNAVAILABLE
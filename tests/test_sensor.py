@@ -0,0 +1,116 @@
+"""Sensor entities created for accounts and for the integration."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.config_entries import SOURCE_IMPORT  # noqa: E402
+from homeassistant.helpers import device_registry as dr  # noqa: E402
+from homeassistant.helpers import entity_registry as er  # noqa: E402
+from pytest_homeassistant_custom_component.common import MockConfigEntry  # noqa: E402
+
+from custom_components.unicom_bill_info.const import (  # noqa: E402
+    CONF_HOUSEHOLD,
+    DOMAIN,
+    HOUSEHOLD_UNIQUE_ID,
+)
+from custom_components.unicom_bill_info.ratelimit import PRIORITY_SCHEDULED  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+QUEUE_ENTITY = "sensor.lian_tong_hua_fei_qing_qiu_dui_lie"
+HOUSEHOLD_BALANCE_ENTITY = "sensor.jia_ting_hui_zong_zong_yu_e"
+
+
+async def test_one_request_queue_sensor_follows_the_limiter(hass, replay_server):
+    """The queue sensor exists once for all accounts and updates as the queue changes."""
+    await async_setup_integration(hass, replay_server)
+    await async_add_account(hass, "account-0000001")
+    await async_add_account(hass, "account-0000002")
+
+    registry = er.async_get(hass)
+    queue_entities = [
+        entry.entity_id for entry in registry.entities.values()
+        if entry.platform == DOMAIN and "queue" in entry.unique_id
+    ]
+    assert queue_entities == [QUEUE_ENTITY]
+    assert registry.async_get(QUEUE_ENTITY).entity_category == er.EntityCategory.DIAGNOSTIC
+    assert hass.states.get(QUEUE_ENTITY).state == "0"
+
+    # 令牌用完后排队的请求立即反映在状态中，获得令牌后恢复
+    limiter = hass.data[DOMAIN]["limiter"]
+    limiter.rate, limiter.burst = 20, 1
+    limiter.pause(0.05)
+    waiting = [asyncio.ensure_future(limiter.acquire(PRIORITY_SCHEDULED)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert hass.states.get(QUEUE_ENTITY).state == "2"
+
+    await asyncio.gather(*waiting)
+    state = hass.states.get(QUEUE_ENTITY)
+    assert state.state == "0"
+    assert state.attributes["峰值"] >= 2
+    assert state.attributes["最近等待时间"] > 0
+
+
+async def test_per_account_queue_sensors_are_removed(hass, replay_server):
+    """Queue entities registered by older versions for each account go away."""
+    openid = "account-0000003"
+    registry = er.async_get(hass)
+    for suffix in ("queue_depth", "queue_wait"):
+        registry.async_get_or_create("sensor", DOMAIN, f"china_unicom_{openid}_{suffix}")
+
+    await async_setup_integration(hass, replay_server)
+    await async_add_account(hass, openid)
+
+    for suffix in ("queue_depth", "queue_wait"):
+        assert registry.async_get_entity_id("sensor", DOMAIN, f"china_unicom_{openid}_{suffix}") is None
+
+
+async def test_household_device_belongs_to_its_config_entry(hass, replay_server):
+    """The household sensors sit on a device of the household entry and sum loaded accounts."""
+    # 第一个账户在汇总条目之前加载，第二个在之后
+    await async_setup_integration(hass, replay_server)
+    first = await async_add_account(hass, "account-0000004")
+    await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_IMPORT}, data={CONF_HOUSEHOLD: True}
+    )
+    await hass.async_block_till_done()
+    second = await async_add_account(hass, "account-0000005")
+
+    household_entries = [
+        entry for entry in hass.config_entries.async_entries(DOMAIN) if entry.data.get(CONF_HOUSEHOLD)
+    ]
+    assert len(household_entries) == 1
+    household_entry = household_entries[0]
+    assert household_entry.supports_options is False
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "household")})
+    assert device is not None
+    assert household_entry.entry_id in device.config_entries
+
+    balance = first.runtime_data.data["balance"] + second.runtime_data.data["balance"]
+    state = hass.states.get(HOUSEHOLD_BALANCE_ENTITY)
+    assert float(state.state) == round(balance, 2)
+    registry = er.async_get(hass)
+    assert registry.async_get(HOUSEHOLD_BALANCE_ENTITY).config_entry_id == household_entry.entry_id
+
+    # 卸载账户后从汇总中去掉
+    assert await hass.config_entries.async_unload(second.entry_id)
+    await hass.async_block_till_done()
+    assert float(hass.states.get(HOUSEHOLD_BALANCE_ENTITY).state) == first.runtime_data.data["balance"]
+
+
+async def test_household_entry_is_removed_with_the_yaml_option(hass, replay_server):
+    """Dropping household from configuration.yaml removes its entry and device."""
+    MockConfigEntry(
+        domain=DOMAIN, version=2, unique_id=HOUSEHOLD_UNIQUE_ID, title="家庭汇总",
+        data={CONF_HOUSEHOLD: True},
+    ).add_to_hass(hass)
+    await async_setup_integration(hass, replay_server)
+    await hass.async_block_till_done()
+
+    assert not any(
+        entry.data.get(CONF_HOUSEHOLD) for entry in hass.config_entries.async_entries(DOMAIN)
+    )
@@ -0,0 +1,98 @@
+"""Entity callbacks per refresh with field-level dispatch.
+
+一个启用独立实体的账户有 17 个实体；每种刷新模式下统计实体写入状态的次数，
+用 pytest -s 运行时打印对照表。
+"""
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.helpers.entity import Entity  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+ACCOUNT_ENTITIES = 17
+
+
+def _balance_only(data):
+    return {**data, "balance": data["balance"] - 0.5}
+
+
+def _data_tick(data):
+    # 流量计数增加：已用、可用和使用比例同时变化
+    return {
+        **data,
+        "data_used": data["data_used"] + 1.5,
+        "data_available": data["data_available"] - 1.5,
+        "data_ratio": round(data["data_ratio"] + 0.01, 2),
+    }
+
+
+def _everything(data):
+    return {key: (value + 1 if isinstance(value, float) else value) for key, value in data.items()}
+
+
+# 刷新模式 -> (修改快照的函数, 应写入状态的实体数)
+PATTERNS = {
+    "no change": (dict, 0),
+    "balance only": (_balance_only, 1),
+    "data tick": (_data_tick, 3),
+    "everything": (_everything, ACCOUNT_ENTITIES),
+}
+
+
+async def test_callbacks_per_refresh(hass, replay_server):
+    """Only the entities showing a changed field write their state."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "dispatch-0001", create_individual_sensors=True)
+    coordinator = entry.runtime_data
+    account_entities = [
+        entity_id for entity_id in hass.states.async_entity_ids("sensor")
+        if entity_id.startswith("sensor.lian_tong_shu_ju_0001_")
+    ]
+    assert len(account_entities) == ACCOUNT_ENTITIES
+
+    writes = []
+    original = Entity.async_write_ha_state
+
+    def _counting_write(entity):
+        writes.append(entity.entity_id)
+        original(entity)
+
+    rows = []
+    with patch.object(Entity, "async_write_ha_state", _counting_write):
+        for pattern, (change, expected) in PATTERNS.items():
+            writes.clear()
+            suppressed = coordinator.suppressed_updates
+            coordinator.async_set_updated_data(change(coordinator.data))
+            await hass.async_block_till_done()
+            rows.append((pattern, len(writes), coordinator.suppressed_updates - suppressed))
+            assert len(writes) == expected, (pattern, writes)
+
+    # 跳过的监听器还包括 Prometheus 指标等非实体监听器
+    print(f"\n{'refresh':<14}{'writes':>8}{'skipped listeners':>19}  (of {ACCOUNT_ENTITIES} entities)")
+    for pattern, callbacks, skipped in rows:
+        print(f"{pattern:<14}{callbacks:>8}{skipped:>19}")
+
+
+async def test_availability_change_reaches_every_entity(hass, replay_server):
+    """A failed refresh notifies every entity so they can turn unavailable."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "dispatch-0002", create_individual_sensors=True)
+    coordinator = entry.runtime_data
+
+    replay_server.faults = ("http_502",)
+    replay_server.rate = 1.0
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    states = [
+        hass.states.get(entity_id) for entity_id in hass.states.async_entity_ids("sensor")
+        if entity_id.startswith("sensor.lian_tong_shu_ju_0002_")
+    ]
+    assert len(states) == ACCOUNT_ENTITIES
+    assert all(state.state == "unavailable" for state in states)
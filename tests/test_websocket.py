@@ -0,0 +1,85 @@
+"""Websocket snapshot subscription."""
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.unicom_bill_info.const import DOMAIN  # noqa: E402
+
+from .common import async_add_account, async_setup_integration  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("enable_custom_integrations")
+
+
+# 等待事件的时间；缺少的事件使测试失败而不是一直等待
+RECEIVE_TIMEOUT = 5
+
+
+async def _async_subscribe(hass, hass_ws_client):
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": f"{DOMAIN}/snapshots/subscribe"})
+    assert (await client.receive_json(timeout=RECEIVE_TIMEOUT))["success"]
+    return client, await _async_event(client)
+
+
+async def _async_event(client):
+    return (await client.receive_json(timeout=RECEIVE_TIMEOUT))["event"]
+
+
+async def test_unchanged_refreshes_send_nothing(hass, hass_ws_client, replay_server):
+    """Only refreshes that change a field or the availability reach the subscriber."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "websocket-0001")
+    coordinator = entry.runtime_data
+    client, first = await _async_subscribe(hass, hass_ws_client)
+    assert first["accounts"][entry.entry_id]["data"] == coordinator.data
+
+    # 没有变化的刷新不发送；下一条事件就是余额变化
+    coordinator.async_set_updated_data(dict(coordinator.data))
+    balance = coordinator.data["balance"] - 1
+    coordinator.async_set_updated_data({**coordinator.data, "balance": balance})
+    event = await _async_event(client)
+    assert event == {
+        "entry_id": entry.entry_id, "available": True, "stale": False,
+        "changed": {"balance": balance},
+    }
+
+
+async def test_subscription_follows_reloaded_and_new_entries(hass, hass_ws_client, replay_server):
+    """A reloaded entry is re-attached and a new entry is added without resubscribing."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "websocket-0002")
+    client, _ = await _async_subscribe(hass, hass_ws_client)
+    original = entry.runtime_data.data["balance"]
+    entry.runtime_data.async_set_updated_data({**entry.runtime_data.data, "balance": original - 1})
+    await _async_event(client)
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    unloaded = await _async_event(client)
+    assert unloaded["entry_id"] == entry.entry_id
+    assert unloaded["available"] is False
+    assert unloaded["changed"] == {}
+    # 重新加载后的首次刷新与之前发送的快照比较
+    loaded = await _async_event(client)
+    assert loaded["available"] is True
+    assert loaded["changed"] == {"balance": original}
+
+    coordinator = entry.runtime_data
+    coordinator.async_set_updated_data({**coordinator.data, "balance": original + 1})
+    assert (await _async_event(client))["changed"] == {"balance": original + 1}
+
+    other = await async_add_account(hass, "websocket-0003")
+    added = await _async_event(client)
+    assert added["entry_id"] == other.entry_id
+    assert added["changed"] == other.runtime_data.data
+
+
+async def test_accounts_use_the_name_from_the_options(hass, hass_ws_client, replay_server):
+    """A name changed in the options is reported like the sensors show it."""
+    await async_setup_integration(hass, replay_server)
+    entry = await async_add_account(hass, "websocket-0003")
+    hass.config_entries.async_update_entry(entry, options={**entry.data, "name": "副卡"})
+    await hass.async_block_till_done()
+
+    _, first = await _async_subscribe(hass, hass_ws_client)
+    assert first["accounts"][entry.entry_id]["name"] == "副卡"